@@ -0,0 +1,105 @@
+"""Micro-benchmark of the issue/comment body cleaning used by the HTML report.
+
+Builds a corpus of synthetic Pagure-migrated issues and comments, checks that
+body_to_html() gives exactly the same output as the previous multi-pass
+implementation, and times both.
+
+Usage:
+    python3 benchmarks/bench_body_cleaner.py [-n COMMENTS] [-r REPEAT]
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import re
+import sys
+import timeit
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "gh-issues-report.py")
+
+USERS = ["mreynolds", "firstyear", "tbordaz", "lkrispen", "vashirov", "spichugi", "droideck"]
+WORDS = ("the server crashes when replication agreement is updated while the changelog "
+         "is trimmed and the index is rebuilt during online import of a large backend").split()
+
+
+def load_report_module():
+    sys.argv = sys.argv[:1]
+    spec = importlib.util.spec_from_file_location("gh_issues_report", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_body_to_html(text):
+    # The implementation body_to_html() replaced, kept here as the reference
+    text = re.sub(r'\*\*Comment from .+?\*\*\n\n', '', text, flags=re.DOTALL)
+    text = re.sub(r'Cloned from Pagure issue:.+?\n', '', text, flags=re.DOTALL)
+    text = re.sub(r'- Created at .+?---\n\n', '', text, flags=re.DOTALL)
+    text = text.strip().replace('\\n', '\n').replace('\\r', '\r')
+    return text.replace('\r\n', '\n').replace('\r', '\n').replace('\n', '<br>')
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, words))).capitalize() + "."
+
+
+def paragraph(rng):
+    # Pagure exports mix real line breaks, CRLF and escaped "\n" sequences
+    separator = rng.choice(["\n", "\r\n", "\\n", "\\r\\n", "\n\n"])
+    return separator.join(sentence(rng) for _ in range(rng.randint(1, 6)))
+
+
+def make_description(rng, number):
+    user = rng.choice(USERS)
+    return (f"Cloned from Pagure issue: https://pagure.io/389-ds-base/issue/{number}\n"
+            f"- Created at 2017-0{rng.randint(1, 9)}-1{rng.randint(0, 9)} 10:11:12 by **{user}** (@{user})\n"
+            f"- Assigned to {rng.choice(USERS)}\n"
+            f"---\n\n"
+            f"#### Issue Description\n{paragraph(rng)}\n\n#### Steps to reproduce\n{paragraph(rng)}")
+
+
+def make_comment(rng):
+    user = rng.choice(USERS)
+    header = f"**Comment from {user} (@{user}) at 2018-02-0{rng.randint(1, 9)} 08:00:00**\n\n"
+    body = "\n\n".join(paragraph(rng) for _ in range(rng.randint(1, 3)))
+    return header + body if rng.random() < 0.9 else body
+
+
+def make_corpus(count, seed=389):
+    rng = random.Random(seed)
+    corpus = []
+    for number in range(count):
+        if number % 10 == 0:
+            corpus.append(make_description(rng, 49000 + number))
+        else:
+            corpus.append(make_comment(rng))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--comments", type=int, default=20000, help="Number of bodies in the corpus (default: 20000)")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Timing repetitions, best is reported (default: 5)")
+    args = parser.parse_args()
+
+    report = load_report_module()
+    corpus = make_corpus(args.comments)
+    size = sum(len(text) for text in corpus)
+
+    mismatches = [text for text in corpus if report.body_to_html(text) != legacy_body_to_html(text)]
+    if mismatches:
+        print(f"{len(mismatches)} bodies differ from the legacy output, first one:\n{mismatches[0]!r}")
+        sys.exit(1)
+
+    legacy = min(timeit.repeat(lambda: [legacy_body_to_html(text) for text in corpus], number=1, repeat=args.repeat))
+    current = min(timeit.repeat(lambda: [report.body_to_html(text) for text in corpus], number=1, repeat=args.repeat))
+
+    print(f"Corpus: {len(corpus)} bodies, {size / 1024 / 1024:.1f} MiB")
+    print(f"legacy multi-pass:  {legacy * 1000:8.1f} ms  ({len(corpus) / legacy:10.0f} bodies/s)")
+    print(f"body_to_html():     {current * 1000:8.1f} ms  ({len(corpus) / current:10.0f} bodies/s)")
+    print(f"Speedup: {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
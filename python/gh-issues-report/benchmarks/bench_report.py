@@ -0,0 +1,120 @@
+"""End to end benchmark of gh-issues-report against the local GitHub stand-in.
+
+Starts benchmarks/fake_github.py in-process and runs the report script once per
+repository size and fetch mode, each run in its own process and output directory.
+For every run it reports the API requests the server answered, the bytes it sent,
+the fetch and render times logged by the script, the total wall time, the peak RSS
+of the script process and the size of the written report. The --json results also
+hold the --metrics summary of every run.
+
+Usage:
+    python3 benchmarks/bench_report.py [--sizes 100,10000] [--modes rest,graphql] [--latency MS]
+                                       [--rate-limit N --rate-window SECONDS] [-w WORKERS] [--json PATH]
+                                       [-- EXTRA SCRIPT ARGS]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_github import start_server
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "gh-issues-report.py")
+
+FETCHED_PATTERN = re.compile(r"Fetched (\d+) issues of \S+ in ([\d.]+)s using (\d+) API requests")
+WRITTEN_PATTERN = re.compile(r"Report written to \S+ in ([\d.]+)s")
+
+
+def peak_rss_mb(rusage):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+               if name.endswith((".html", ".js")))
+
+
+def run_case(server, size, mode, workers, extra_args):
+    server.reset_stats()
+    with tempfile.TemporaryDirectory(prefix="gh-issues-bench-") as output_dir:
+        command = [sys.executable, SCRIPT, "-g", f"bench/issues-{size}", "-a", "bench-token",
+                   "--api-url", server.url, "-m", mode, "-w", str(workers), "-o", output_dir,
+                   "--checkpoint", os.path.join(output_dir, "checkpoint.jsonl"),
+                   "--metrics", os.path.join(output_dir, "metrics.json")] + extra_args
+        start_time = time.monotonic()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        output = process.stdout.read()
+        # wait4() gives the resource usage of this one child, not of all of them
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall = time.monotonic() - start_time
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            print(output, file=sys.stderr)
+            sys.exit(f"Run of {size} issues in {mode} mode failed with exit code {process.returncode}")
+        with open(os.path.join(output_dir, "metrics.json")) as f:
+            run_metrics = json.load(f)
+        fetched = FETCHED_PATTERN.search(output)
+        written = WRITTEN_PATTERN.search(output)
+        return {
+            'size': size,
+            'mode': mode,
+            'issues': int(fetched.group(1)),
+            'requests': server.stats['requests'],
+            'client_requests': int(fetched.group(3)),
+            'received_mb': server.stats['bytes_sent'] / 1024 / 1024,
+            'rate_limited': server.stats['rate_limited'],
+            'fetch_seconds': float(fetched.group(2)),
+            'render_seconds': float(written.group(1)),
+            'wall_seconds': wall,
+            'peak_rss_mb': peak_rss_mb(rusage),
+            'report_mb': directory_size(output_dir) / 1024 / 1024,
+            'endpoints': dict(server.stats['endpoints']),
+            'metrics': run_metrics,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="100,10000",
+                        help="Comma separated repository sizes in issues (default: 100,10000)")
+    parser.add_argument("--modes", default="rest,graphql", help="Comma separated fetch modes (default: rest,graphql)")
+    parser.add_argument("--latency", type=float, default=0, metavar="MS", help="Delay added to every API response")
+    parser.add_argument("--rate-limit", type=int, default=1000000,
+                        help="Requests per window and resource the server allows (default: 1000000)")
+    parser.add_argument("--rate-window", type=int, default=3600, metavar="SECONDS",
+                        help="Length of the server rate limit window (default: 3600)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="--workers passed to the script (default: 1)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to this JSON file")
+    parser.add_argument("extra", nargs="*", help="Extra arguments for the script, after --")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency / 1000, rate_limit=args.rate_limit, rate_window=args.rate_window)
+    print(f"Fake GitHub API on {server.url}, latency {args.latency:g}ms")
+    header = (f"{'issues':>8} {'mode':<8} {'requests':>9} {'recv MB':>8} {'fetch s':>8} {'render s':>9} "
+              f"{'wall s':>8} {'RSS MB':>7} {'report MB':>10}")
+    print(header)
+    print("-" * len(header))
+    results = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        for mode in args.modes.split(","):
+            result = run_case(server, size, mode, args.workers, args.extra)
+            results.append(result)
+            print(f"{result['issues']:>8} {mode:<8} {result['requests']:>9} {result['received_mb']:>8.1f} "
+                  f"{result['fetch_seconds']:>8.1f} {result['render_seconds']:>9.1f} {result['wall_seconds']:>8.1f} "
+                  f"{result['peak_rss_mb']:>7.0f} {result['report_mb']:>10.1f}")
+    server.shutdown()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""Local stand-in for the parts of the GitHub REST and GraphQL APIs gh-issues-report uses.
+
+Serves synthetic repositories named after their size: bench/issues-100 has 100 open
+issues, bench/issues-100000 has 100000. The issues, labels, milestones and comment
+threads are generated from the issue number, so every run sees the same data and
+nothing is kept in memory but the sort orders. Latency and the rate limit can be set
+to get closer to the real API.
+
+Usage:
+    python3 benchmarks/fake_github.py [--port 8000] [--latency MS] [--rate-limit N]
+    python3 gh-issues-report.py -g bench/issues-1000 -a token --api-url http://127.0.0.1:8000
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+USERS = ["mreynolds", "firstyear", "tbordaz", "lkrispen", "vashirov", "spichugi", "droideck"]
+LABELS = ["needs triage", "bug", "RFE", "replication", "performance", "documentation", "easyfix"]
+MILESTONES = {1: "1.4.4", 2: "2.x", 3: "FUTURE"}
+WORDS = ("the server crashes when replication agreement is updated while the changelog "
+         "is trimmed and the index is rebuilt during online import of a large backend").split()
+START = datetime(2015, 1, 1, tzinfo=timezone.utc)
+REPO_PATTERN = re.compile(r"issues-(\d+)$")
+
+
+def isoformat(date):
+    return date.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def text(seed, words):
+    return " ".join(WORDS[(seed * 31 + i * 7) % len(WORDS)] for i in range(words))
+
+
+class SyntheticRepo:
+    """Open issues 1..size, everything derived from the issue number."""
+
+    def __init__(self, owner, name, size):
+        self.owner = owner
+        self.name = name
+        self.size = size
+        self.by_updated = None
+
+    def created(self, number):
+        return START + timedelta(minutes=20 * number)
+
+    def updated(self, number):
+        return self.created(number) + timedelta(hours=(number * 7919) % 1000)
+
+    def labels(self, number):
+        return [LABELS[number % len(LABELS)]] + ([LABELS[0]] if number % 3 == 0 and number % len(LABELS) else [])
+
+    def milestone(self, number):
+        return number % 4 or None
+
+    def assignee(self, number):
+        return USERS[number % len(USERS)] if number % 5 else None
+
+    def comment_count(self, number):
+        # A few long threads need more than one comments page
+        return 150 if number % 500 == 0 else number % 12
+
+    def body(self, number):
+        body = text(number, 40 + number % 60)
+        if number % 2:
+            # Pagure migrated issue, the report strips this header again
+            body = (f"Cloned from Pagure issue: https://pagure.io/{self.name}/issue/{number}\n"
+                    f"- Created at 2016-03-04 10:00:00 by {USERS[number % len(USERS)]}\n"
+                    f"- Assigned to nobody\n---\n\n{body}")
+        return body
+
+    def comment(self, number, index):
+        user = USERS[(number + index) % len(USERS)]
+        if index % 5 == 4:
+            body = f"**Metadata Update from @{user}**:\n- Issue assigned to {user}"
+        else:
+            body = f"**Comment from {user} (@{user}) at 2017-01-01**\n\n{text(number + index, 10 + index % 50)}"
+        return body, self.created(number) + timedelta(hours=index + 1)
+
+    def matching(self, order="created", since=None, labels=None, match_all=True, milestone=None, assignee=None):
+        """Issue numbers passing the list filters of the API, in the requested order."""
+        if order == "updated":
+            if self.by_updated is None:
+                self.by_updated = sorted(range(1, self.size + 1), key=self.updated)
+            numbers = self.by_updated
+        else:
+            numbers = range(1, self.size + 1)
+        for number in numbers:
+            if since and self.updated(number) < since:
+                continue
+            if labels:
+                issue_labels = self.labels(number)
+                found = [label in issue_labels for label in labels]
+                if not (all(found) if match_all else any(found)):
+                    continue
+            if milestone not in (None, "*"):
+                if milestone == "none" and self.milestone(number) is not None:
+                    continue
+                if milestone != "none" and str(self.milestone(number)) != milestone:
+                    continue
+            if assignee not in (None, "*") and (self.assignee(number) or "none") != assignee:
+                continue
+            yield number
+
+
+class FakeGithub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, rate_limit=5000, rate_window=3600):
+        super().__init__(address, FakeGithubHandler)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.repos = {}
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {'requests': 0, 'bytes_sent': 0, 'rate_limited': 0, 'endpoints': {}}
+            self.windows = {}
+
+    def count(self, endpoint, sent):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes_sent'] += sent
+            self.stats['endpoints'][endpoint] = self.stats['endpoints'].get(endpoint, 0) + 1
+
+    def take_quota(self, resource):
+        """Use one request of the resource budget: returns (allowed, remaining, reset)."""
+        now = time.time()
+        with self.lock:
+            start, used = self.windows.get(resource, (now, 0))
+            if now >= start + self.rate_window:
+                start, used = now, 0
+            allowed = used < self.rate_limit
+            if allowed:
+                used += 1
+            else:
+                self.stats['rate_limited'] += 1
+            self.windows[resource] = (start, used)
+            return allowed, self.rate_limit - used, int(start + self.rate_window) + 1
+
+    def repo(self, owner, name):
+        match = REPO_PATTERN.match(name)
+        if not match:
+            return None
+        with self.lock:
+            key = (owner, name)
+            if key not in self.repos:
+                self.repos[key] = SyntheticRepo(owner, name, int(match.group(1)))
+            return self.repos[key]
+
+
+class FakeGithubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, Nagle would hold the body back for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, endpoint, data, status=200, headers=None):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.count(endpoint, len(payload))
+
+    def quota_headers(self, resource):
+        allowed, remaining, reset = self.server.take_quota(resource)
+        return allowed, {
+            "X-RateLimit-Limit": str(self.server.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(reset),
+            "X-RateLimit-Resource": resource,
+        }
+
+    def page_links(self, url, query, page, per_page, total):
+        if page * per_page >= total:
+            return {}
+        query = dict(query, page=page + 1, per_page=per_page)
+        return {"Link": f'<{self.server.url}{url.path}?{urlencode(query)}>; rel="next"'}
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        if parts == ["rate_limit"]:
+            reset = int(time.time() + self.server.rate_window)
+            core = {"limit": self.server.rate_limit, "remaining": self.server.rate_limit, "reset": reset, "used": 0}
+            return self.send_json("rate_limit", {"resources": {"core": core, "graphql": core, "search": core}, "rate": core})
+        if len(parts) < 3 or parts[0] != "repos":
+            return self.send_json("unknown", {"message": "Not Found"}, 404)
+        repo = self.server.repo(parts[1], parts[2])
+        if repo is None:
+            return self.send_json("unknown", {"message": "Not Found"}, 404)
+        allowed, headers = self.quota_headers("core")
+        if not allowed:
+            return self.send_json("rate_limited", {"message": "API rate limit exceeded"}, 403, headers)
+        endpoint = "/".join(part if not part.isdigit() else ":n" for part in parts[3:]) or "repo"
+        if len(parts) == 3:
+            return self.send_json(endpoint, self.rest_repo(repo), headers=headers)
+        if parts[3] == "milestones":
+            if len(parts) == 5:
+                return self.send_json(endpoint, self.rest_milestone(repo, int(parts[4])), headers=headers)
+            return self.send_json(endpoint, [self.rest_milestone(repo, number) for number in MILESTONES], headers=headers)
+        if parts[3] == "issues" and len(parts) == 4:
+            per_page = int(query.get("per_page", 30))
+            page = int(query.get("page", 1))
+            if query.get("state", "open") == "closed":
+                numbers = []
+            else:
+                since = datetime.fromisoformat(query["since"].replace("Z", "+00:00")) if "since" in query else None
+                numbers = list(repo.matching(query.get("sort", "created"), since,
+                                             query["labels"].split(",") if "labels" in query else None, True,
+                                             query.get("milestone"), query.get("assignee")))
+            if query.get("direction", "desc") == "desc":
+                numbers.reverse()
+            issues = [self.rest_issue(repo, number) for number in numbers[(page - 1) * per_page:page * per_page]]
+            headers.update(self.page_links(url, query, page, per_page, len(numbers)))
+            return self.send_json(endpoint, issues, headers=headers)
+        if parts[3] == "issues" and len(parts) == 6 and parts[5] == "comments":
+            number = int(parts[4])
+            per_page = int(query.get("per_page", 30))
+            page = int(query.get("page", 1))
+            total = repo.comment_count(number)
+            comments = [self.rest_comment(repo, number, index)
+                        for index in range((page - 1) * per_page, min(page * per_page, total))]
+            headers.update(self.page_links(url, query, page, per_page, total))
+            return self.send_json(endpoint, comments, headers=headers)
+        return self.send_json("unknown", {"message": "Not Found"}, 404, headers)
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if urlparse(self.path).path != "/graphql":
+            return self.send_json("unknown", {"message": "Not Found"}, 404)
+        allowed, headers = self.quota_headers("graphql")
+        if not allowed:
+            # GraphQL reports the exhausted quota in the body of a 200 response
+            return self.send_json("graphql:rate_limited", {"errors": [{"type": "RATE_LIMITED",
+                                                                      "message": "API rate limit exceeded"}]},
+                                  headers=headers)
+        query, variables = request["query"], request.get("variables") or {}
+        repo = self.server.repo(variables.get("owner"), variables.get("repo"))
+        if repo is None:
+            return self.send_json("graphql", {"data": {"repository": None},
+                                              "errors": [{"type": "NOT_FOUND", "message": "Could not resolve"}]},
+                                  headers=headers)
+        if "issue(number:" in query:
+            return self.send_json("graphql:comments", {"data": {"repository": {"issue": {
+                "comments": self.graphql_comments(repo, query, variables["number"], variables.get("cursor"), 100)}}}},
+                headers=headers)
+        return self.send_json("graphql:issues", {"data": {"repository": {"issues": self.graphql_issues(repo, query, variables)}}},
+                              headers=headers)
+
+    def rest_repo(self, repo):
+        return {
+            "id": repo.size,
+            "name": repo.name,
+            "full_name": f"{repo.owner}/{repo.name}",
+            "owner": {"login": repo.owner},
+            "url": f"{self.server.url}/repos/{repo.owner}/{repo.name}",
+            "html_url": f"https://github.com/{repo.owner}/{repo.name}",
+            "has_issues": True,
+            "archived": False,
+            "open_issues_count": repo.size,
+        }
+
+    def rest_milestone(self, repo, number):
+        return {"number": number, "title": MILESTONES[number], "state": "open",
+                "url": f"{self.server.url}/repos/{repo.owner}/{repo.name}/milestones/{number}"}
+
+    def rest_issue(self, repo, number):
+        milestone = repo.milestone(number)
+        assignee = repo.assignee(number)
+        return {
+            "url": f"{self.server.url}/repos/{repo.owner}/{repo.name}/issues/{number}",
+            "html_url": f"https://github.com/{repo.owner}/{repo.name}/issues/{number}",
+            "number": number,
+            "state": "open",
+            "title": f"Issue {number}: {text(number, 6)}",
+            "body": repo.body(number),
+            "user": {"login": USERS[number % len(USERS)]},
+            "labels": [{"name": label} for label in repo.labels(number)],
+            "assignee": {"login": assignee} if assignee else None,
+            "assignees": [{"login": assignee}] if assignee else [],
+            "milestone": self.rest_milestone(repo, milestone) if milestone else None,
+            "comments": repo.comment_count(number),
+            "created_at": isoformat(repo.created(number)),
+            "updated_at": isoformat(repo.updated(number)),
+        }
+
+    def rest_comment(self, repo, number, index):
+        body, created = repo.comment(number, index)
+        return {"id": number * 1000 + index, "body": body, "user": {"login": USERS[index % len(USERS)]},
+                "created_at": isoformat(created), "updated_at": isoformat(created)}
+
+    def graphql_comments(self, repo, query, number, cursor, first):
+        start = int(cursor or 0)
+        end = min(start + first, repo.comment_count(number))
+        nodes = []
+        for index in range(start, end):
+            body, created = repo.comment(number, index)
+            nodes.append({"body": body, "createdAt": isoformat(created)} if "body createdAt" in query else {"body": body})
+        return {"pageInfo": {"hasNextPage": end < repo.comment_count(number), "endCursor": str(end)}, "nodes": nodes}
+
+    def graphql_issues(self, repo, query, variables):
+        if "OPEN" not in (variables.get("states") or ["OPEN"]):
+            numbers = []
+        else:
+            since = variables.get("since")
+            numbers = list(repo.matching("updated" if variables.get("orderField") == "UPDATED_AT" else "created",
+                                         datetime.fromisoformat(since.replace("Z", "+00:00")) if since else None,
+                                         variables.get("labels"), False, variables.get("milestone"),
+                                         variables.get("assignee")))
+        start = int(variables.get("cursor") or 0)
+        end = min(start + variables["pageSize"], len(numbers))
+        nodes = []
+        for number in numbers[start:end]:
+            node = {
+                "number": number,
+                "state": "OPEN",
+                "title": f"Issue {number}: {text(number, 6)}",
+                "body": repo.body(number),
+                "url": f"https://github.com/{repo.owner}/{repo.name}/issues/{number}",
+                "createdAt": isoformat(repo.created(number)),
+                "updatedAt": isoformat(repo.updated(number)),
+                "comments": self.graphql_comments(repo, query, number, None, variables["commentsSize"]),
+            }
+            if "labels(first" in query:
+                node["labels"] = {"nodes": [{"name": label} for label in repo.labels(number)]}
+            if "milestone {" in query:
+                milestone = repo.milestone(number)
+                node["milestone"] = {"title": MILESTONES[milestone]} if milestone else None
+            if "assignees(first" in query:
+                assignee = repo.assignee(number)
+                node["assignees"] = {"nodes": [{"login": assignee}] if assignee else []}
+            nodes.append(node)
+        return {"pageInfo": {"hasNextPage": end < len(numbers), "endCursor": str(end)}, "nodes": nodes}
+
+
+def start_server(host="127.0.0.1", port=0, latency=0.0, rate_limit=5000, rate_window=3600):
+    """Start a FakeGithub in a background thread, port 0 picks a free port."""
+    server = FakeGithub((host, port), latency, rate_limit, rate_window)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake of the GitHub API for gh-issues-report benchmarks")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("-p", "--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    parser.add_argument("--latency", type=float, default=0, metavar="MS", help="Delay added to every response")
+    parser.add_argument("--rate-limit", type=int, default=5000, help="Requests per window and resource (default: 5000)")
+    parser.add_argument("--rate-window", type=int, default=3600, metavar="SECONDS",
+                        help="Length of the rate limit window (default: 3600)")
+    args = parser.parse_args()
+
+    server = FakeGithub((args.host, args.port), args.latency / 1000, args.rate_limit, args.rate_window)
+    print(f"Serving bench/issues-<N> repositories on {server.url}, Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.stats, indent=2))
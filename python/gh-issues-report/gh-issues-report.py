@@ -2,14 +2,25 @@
 
 import argparse
 import argcomplete
+import atexit
+import bisect
+import cProfile
+import html
+import importlib.util
 import json
 import logging
+import os
 import re
 import signal
+import sqlite3
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import requests
 from github import Github, GithubException, RateLimitExceededException
-import pandas as pd
 
 parser = argparse.ArgumentParser()
 parser.add_argument(
@@ -23,7 +34,99 @@ parser.add_argument(
     "-g",
     "--github-repo",
     type=str,
-    help="GitHub repo in a format user/repo-name (example: droideck/389-ds-base)",
+    action="append",
+    help="GitHub repo in a format user/repo-name (example: droideck/389-ds-base), "
+         "repeat it or separate repos with commas for a batch report",
+)
+parser.add_argument(
+    "--org",
+    type=str,
+    help="GitHub organization, every repository of it with open issues is added to the batch",
+)
+parser.add_argument(
+    "-o",
+    "--output-dir",
+    type=str,
+    default=".",
+    help="Directory the reports are written to; batch runs write one report per repo and an index.html (default: .)",
+)
+parser.add_argument(
+    "-f",
+    "--format",
+    type=str,
+    default="html",
+    help="Comma separated output formats: html, jsonl, parquet (default: html)",
+)
+parser.add_argument(
+    "--label",
+    type=str,
+    action="append",
+    help="Only report issues with this label, repeat it to require several labels",
+)
+parser.add_argument(
+    "--milestone",
+    type=str,
+    help="Only report issues of this milestone, by title or number",
+)
+parser.add_argument(
+    "--assignee",
+    type=str,
+    help="Only report issues assigned to this user",
+)
+parser.add_argument(
+    "--created-after",
+    type=str,
+    metavar="DATE",
+    help="Only report issues created at or after this ISO date (example: 2024-01-31)",
+)
+parser.add_argument(
+    "--created-before",
+    type=str,
+    metavar="DATE",
+    help="Only report issues created before this ISO date",
+)
+parser.add_argument(
+    "--updated-after",
+    type=str,
+    metavar="DATE",
+    help="Only report issues updated at or after this ISO date",
+)
+parser.add_argument(
+    "--updated-before",
+    type=str,
+    metavar="DATE",
+    help="Only report issues updated before this ISO date",
+)
+parser.add_argument(
+    "--max-comments",
+    type=int,
+    metavar="N",
+    help="Fetch at most N comments per issue",
+)
+parser.add_argument(
+    "--minimal-fields",
+    help="GraphQL mode: only fetch the issue title, body and url and the comment bodies "
+         "(plus the ids and dates used for ordering and caching)",
+    action="store_true",
+    default=False,
+)
+shard_group = parser.add_mutually_exclusive_group()
+shard_group.add_argument(
+    "--shard-size",
+    type=int,
+    metavar="N",
+    help="Split the report into pages of N issues behind a small searchable index",
+)
+shard_group.add_argument(
+    "--shard-by",
+    choices=["label", "milestone"],
+    help="Split the report into one page per label or milestone behind a small searchable index",
+)
+parser.add_argument(
+    "--parallel-repos",
+    type=int,
+    default=4,
+    help="Number of repositories fetched at the same time in a batch run, 1-10 (default: 4)",
 )
 parser.add_argument(
     "-a",
@@ -32,189 +135,1480 @@ parser.add_argument(
     nargs="?",
     help="GitHub API key"
 )
+parser.add_argument(
+    "--api-url",
+    type=str,
+    default="https://api.github.com",
+    help="Base URL of the GitHub API, for GitHub Enterprise or the benchmark stand-in (default: https://api.github.com)",
+)
+parser.add_argument(
+    "-m",
+    "--fetch-mode",
+    choices=["rest", "graphql"],
+    default="rest",
+    help="API used to fetch issues: 'rest' makes one request per issue for its comments, "
+         "'graphql' fetches issues together with their comments in bulk pages (default: rest)",
+)
+parser.add_argument(
+    "--page-size",
+    type=int,
+    default=50,
+    help="Number of issues requested per GraphQL page, 1-100 (default: 50)",
+)
+parser.add_argument(
+    "--first-comments",
+    type=int,
+    default=50,
+    help="Number of comments fetched inline with each issue in GraphQL mode, 1-100; "
+         "longer threads are paginated separately (default: 50)",
+)
+parser.add_argument(
+    "-c",
+    "--cache",
+    type=str,
+    metavar="PATH",
+    help="SQLite file used to cache issues between runs; later runs only fetch issues updated "
+         "since the previous sync (example: gh-issues-cache.sqlite)",
+)
+parser.add_argument(
+    "-w",
+    "--workers",
+    type=int,
+    default=1,
+    help="Number of comment threads fetched in parallel in REST mode, 1-20 (default: 1)",
+)
+parser.add_argument(
+    "--checkpoint",
+    type=str,
+    metavar="PATH",
+    default="gh-issues-checkpoint.jsonl",
+    help="File the fetched pages are checkpointed to while the fetch runs (default: gh-issues-checkpoint.jsonl)",
+)
+parser.add_argument(
+    "-r",
+    "--resume",
+    help="Continue an interrupted fetch from the last page saved in the checkpoint file",
+    action="store_true",
+    default=False,
+)
+
+parser.add_argument(
+    "--metrics",
+    type=str,
+    metavar="PATH",
+    help="Write a JSON summary of the run (API calls, bytes, sleeps, cache hits, stage timings) to PATH",
+)
+parser.add_argument(
+    "--profile",
+    type=str,
+    metavar="PATH",
+    help="Run under cProfile and dump the stats to PATH (open them with python3 -m pstats PATH)",
+)
 
 argcomplete.autocomplete(parser)
 
-report_data = {}
+# Sharding options given on the command line, see HtmlExportWriter
+report_options = {}
+# Formats given with --format, and the open HTML/JSONL/Parquet exports (see open_exports())
+report_formats = ["html"]
+export_writers = []
+# Workers of the run, Ctrl+C lets them export what they gathered (see GithubWorker.interrupt())
+workers = []
+batch_run = False
 root = logging.getLogger()
 log = logging.getLogger("gh-issues-report")
 log_handler = logging.StreamHandler(sys.stdout)
 
+class RunMetrics:
+    """Counters and per-stage timings of a run, shared by every thread.
+
+    Stage durations go into fixed histogram buckets instead of being kept one by one, so
+    a run with a hundred thousand requests costs the same few bytes. Stages nest: "fetch"
+    contains the pages, which contain their HTTP calls.
+    """
+
+    BUCKETS = (0.001, 0.01, 0.1, 1, 10, 60)
+    BUCKET_NAMES = ("<1ms", "<10ms", "<100ms", "<1s", "<10s", "<60s", ">=60s")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counters = {}
+        self.stages = {}
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, stage, seconds):
+        with self.lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {'count': 0, 'total': 0.0, 'max': 0.0, 'buckets': [0] * len(self.BUCKET_NAMES)}
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['buckets'][bisect.bisect_right(self.BUCKETS, seconds)] += 1
+
+    @contextmanager
+    def stage(self, name):
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - start_time)
+
+    def sleep(self, reason, seconds):
+        """time.sleep() that is accounted for, so rate limit waits show up in the summary."""
+        self.count('sleep_seconds', seconds)
+        self.count(f"sleep_seconds.{reason}", seconds)
+        time.sleep(seconds)
+
+    def summary(self):
+        with self.lock:
+            return {
+                'wall_seconds': round(time.monotonic() - self.started, 3),
+                'counters': {name: round(value, 3) if isinstance(value, float) else value
+                             for name, value in sorted(self.counters.items())},
+                'stages': {name: {
+                    'count': entry['count'],
+                    'total_seconds': round(entry['total'], 3),
+                    'mean_seconds': round(entry['total'] / entry['count'], 4),
+                    'max_seconds': round(entry['max'], 3),
+                    'histogram': dict(zip(self.BUCKET_NAMES, entry['buckets'])),
+                } for name, entry in sorted(self.stages.items())},
+            }
+
+
+metrics = RunMetrics()
+
+
+def finish_run(args, profiler):
+    """Dump the profile and the metrics summary, also on sys.exit() and Ctrl+C."""
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        log.info(f"Profile written to {args.profile}")
+    summary = metrics.summary()
+    log.debug("Run metrics: %s" % json.dumps(summary))
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        log.info(f"Run metrics written to {args.metrics}")
+
+
 # Handle a control-c gracefully
 def signal_handler(signal, frame):
     print("\nCTRL-C detected. Displaying the gathered report...\n")
-    create_html_report(report_data, log)
+    for worker in workers:
+        worker.interrupt()
+    # The exports already hold every completed page, they only need their footers
+    for writer in export_writers:
+        writer.close()
+    print("The fetched pages are kept in the checkpoint file, run again with --resume to continue.")
+    if batch_run:
+        # The repository threads would otherwise be waited for, the checkpoints are already on disk
+        os._exit(0)
     sys.exit(0)
 
-def remove_meta_content(text):
-    # Pattern for the "Comment from..." text
-    comment_pattern = r'\*\*Comment from .+?\*\*\n\n'
-    text = re.sub(comment_pattern, '', text, flags=re.DOTALL)
+# Pagure migration metadata: the "Comment from..." header, the "Cloned from Pagure issue..." line
+# and the "Created at..." block. The patterns are compiled once and each one is only run over the
+# bodies that contain its leading literal, which a plain substring test finds much faster.
+META_CONTENT_PATTERNS = [
+    ('**Comment from ', re.compile(r'\*\*Comment from .+?\*\*\n\n', re.DOTALL)),
+    ('Cloned from Pagure issue:', re.compile(r'Cloned from Pagure issue:.+?\n', re.DOTALL)),
+    ('- Created at ', re.compile(r'- Created at .+?---\n\n', re.DOTALL)),
+]
 
-    # Pattern for the "Cloned from Pagure issue..." text
-    cloned_pattern = r'Cloned from Pagure issue:.+?\n'
-    text = re.sub(cloned_pattern, '', text, flags=re.DOTALL)
 
-    # Pattern for the "Created at..." text
-    cloned_pattern = r'- Created at .+?---\n\n'
-    text = re.sub(cloned_pattern, '', text, flags=re.DOTALL)
+def is_metadata_comment(body):
+    # Pagure "Metadata Update" comments only record label/assignee changes, they are not reported
+    return "**Metadata Update from" in body
 
-    text = text.strip().replace('\\n', '\n').replace('\\r', '\r')
+
+def remove_meta_content(text):
+    for marker, pattern in META_CONTENT_PATTERNS:
+        if marker in text:
+            text = pattern.sub('', text)
+    text = text.strip()
+    if '\\' in text:
+        text = text.replace('\\n', '\n').replace('\\r', '\r')
     return text
 
 
-def create_html_report(data_dict, log):
-    log.debug("Creating issues dataframes...")
-    issues_data = []
-    for issue in data_dict['issues']:
-        # Process description once and then replace newlines for HTML
-        description_text = remove_meta_content(issue['description'])
-        # Normalize all newline types to \n, then convert to <br>
-        description_html = description_text.replace('\r\n', '\n').replace('\r', '\n').replace('\n', '<br>')
-
-        issues_data.append({
-            'Title (URL)': f'<a href="{issue["url"]}">{issue["title"]}</a>',
-            'Description': description_html,
-            # The 'Comments' column for the main issue row also shows the issue's description
-            'Comments': description_html,
-        })
+def body_to_html(text):
+    """Clean an issue or comment body and convert its line breaks to <br>.
+
+    The newline normalisation passes are skipped for bodies without a carriage return.
+    """
+    text = remove_meta_content(text or '')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text.replace('\n', '<br>')
+
+
+REPORT_STYLE = """        /* For alternating row colors */
+        tbody tr:nth-child(odd) {
+            background-color: #ffffff; /* white */
+        }
+        tbody tr:nth-child(even) {
+            background-color: #f8f9fa; /* lighter gray */
+        }
+        /* Ensure links within table cells are styled nicely */
+        td a {
+            color: #007bff; /* Link color */
+            text-decoration: none;
+        }
+        td a:hover {
+            text-decoration: underline;
+        }
+"""
+
+REPORT_COLUMN_WIDTHS = """        /* Column widths - applied because 'table-fixed' is on the table */
+        thead th:nth-child(1), tbody td:nth-child(1) { width: 30%; } /* Title (URL) - wider */
+        thead th:nth-child(2), tbody td:nth-child(2) { width: 35%; } /* Description */
+        thead th:nth-child(3), tbody td:nth-child(3) { width: 35%; } /* Comments */
+"""
+
+REPORT_TAIL = """            </tbody>
+        </table>
+    </div>
+</body>
+</html>
+"""
+
+REPORT_HEADER_CELL = '<th class="px-6 py-3 text-left text-xs font-medium text-gray-600 uppercase tracking-wider border-b border-gray-300">'
+# Kept break-words and align-top, column widths come from the CSS above
+REPORT_CELL = '<td class="px-6 py-4 text-sm text-gray-700 border-b border-gray-300 break-words align-top">'
+
+
+def page_head(title, columns, style=REPORT_STYLE, intro=""):
+    """Everything of a report page up to the opening <tbody>."""
+    header_cells = "".join(f"                    {REPORT_HEADER_CELL}{column}</th>\n" for column in columns)
+    return (f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <script src="https://cdn.tailwindcss.com"></script>
+    <title>{title}</title>
+    <style>
+{style}    </style>
+</head>
+<body class="bg-gray-50 p-8">
+    <div class="container mx-auto bg-white shadow-lg rounded-lg p-6">
+        <h1 class="text-4xl font-bold mb-6 text-center text-gray-800">{title}</h1>
+{intro}        <table class="min-w-full table-fixed divide-y divide-gray-200 border border-gray-300 shadow-md rounded-lg">
+            <thead class="bg-gray-100">
+                <tr>
+{header_cells}                </tr>
+            </thead>
+            <tbody>
+""")
+
+
+def table_row(*cells, row_id=None):
+    return ((f'                <tr id="{row_id}">\n' if row_id else "                <tr>\n")
+            + "".join(f"                    {REPORT_CELL}{cell}</td>\n" for cell in cells)
+            + "                </tr>\n")
+
+
+class HtmlReportWriter:
+    """Writes the report table row by row, the issues can come in one page at a time."""
+
+    def __init__(self, path, log, title="GitHub Issues Report"):
+        self.path = path
+        self.log = log
+        self.title = title
+        self.file = None
+        self.issues = 0
+        self.comments = 0
+
+    def __enter__(self):
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.file.write(page_head(html.escape(self.title), ["Title (URL)", "Description", "Comments"],
+                                  REPORT_STYLE + REPORT_COLUMN_WIDTHS))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.file:
+            self.file.write(REPORT_TAIL)
+            self.file.close()
+            self.file = None
+
+    def write_row(self, title, description, comments, row_id=None):
+        self.file.write(table_row(title, description, comments, row_id=row_id))
+
+    def write_issue(self, issue):
+        description_html = body_to_html(issue['description'])
+        title_html = f'<a href="{html.escape(issue["url"])}">{html.escape(issue["title"])}</a>'
+        # The 'Comments' column for the main issue row also shows the issue's description
+        self.write_row(title_html, description_html, description_html, row_id=f"issue-{issue.get('number')}")
+        self.issues += 1
         for comment in issue['comments']:
-            if "**Metadata Update from" in comment['body']:
+            if is_metadata_comment(comment['body']):
                 continue
-            # Process comment body and then replace newlines for HTML
-            comment_body_text = remove_meta_content(comment['body'])
-            # Normalize all newline types to \n, then convert to <br>
-            comment_body_html = comment_body_text.replace('\r\n', '\n').replace('\r', '\n').replace('\n', '<br>')
-            issues_data.append({
-                'Title (URL)': '',
-                'Description': '',
-                'Comments': comment_body_html
+            self.write_row('', '', body_to_html(comment['body']))
+            self.comments += 1
+
+
+SEARCH_SCRIPT = """        <input id="search" type="search" placeholder="Search issue titles, labels and milestones..."
+               class="w-full mb-4 px-4 py-2 border border-gray-300 rounded-lg">
+        <ul id="results" class="mb-6 text-sm"></ul>
+        <script src="%s"></script>
+        <script>
+            // Entries: [number, title, url, page, labels, milestone]
+            const input = document.getElementById("search");
+            const results = document.getElementById("results");
+            input.addEventListener("input", () => {
+                const query = input.value.trim().toLowerCase();
+                results.innerHTML = "";
+                if (!query) return;
+                const matches = SEARCH_INDEX.filter(entry =>
+                    `${entry[1]} ${entry[4].join(" ")} ${entry[5] || ""}`.toLowerCase().includes(query));
+                for (const entry of matches.slice(0, 100)) {
+                    const item = document.createElement("li");
+                    const link = document.createElement("a");
+                    link.href = `${entry[3]}#issue-${entry[0]}`;
+                    link.textContent = `#${entry[0]} ${entry[1]}`;
+                    link.className = "text-blue-600";
+                    item.appendChild(link);
+                    results.appendChild(item);
+                }
+                if (matches.length > 100) {
+                    results.insertAdjacentHTML("beforeend", `<li>... ${matches.length - 100} more</li>`);
+                }
+            });
+        </script>
+"""
+
+
+class ShardedReportWriter:
+    """Splits the report into pages of shard_size issues, or one page per label or milestone.
+
+    The report path itself becomes a small index with the issue and comment counts of every
+    page and a search box. The search data only holds titles, labels and milestones, and is
+    written as a script next to the index, so it also loads from file:// where fetch() is blocked.
+    """
+
+    def __init__(self, path, log, shard_size=None, shard_by=None):
+        self.path = path
+        self.log = log
+        self.shard_size = shard_size
+        self.shard_by = shard_by
+        self.stem, self.ext = os.path.splitext(path)
+        # shard key -> open HtmlReportWriter, in the order the pages were created
+        self.writers = {}
+        self.search_file = None
+        self.issue_count = 0
+
+    def __enter__(self):
+        self.search_file = open(f"{self.stem}-search.js", "w", encoding="utf-8")
+        self.search_file.write("const SEARCH_INDEX = [\n")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for writer in self.writers.values():
+            writer.close()
+        self.search_file.write("];\n")
+        self.search_file.close()
+        self.write_index()
+
+    def shard_keys(self, issue):
+        if self.shard_by == "label":
+            return issue.get('labels') or ["no label"]
+        if self.shard_by == "milestone":
+            return [issue.get('milestone') or "no milestone"]
+        return [str(self.issue_count // self.shard_size + 1)]
+
+    def writer(self, key):
+        if key not in self.writers:
+            if self.shard_by:
+                slug = re.sub(r'[^A-Za-z0-9]+', '-', key).strip('-').lower() or "page"
+                path = f"{self.stem}-{self.shard_by}-{slug}{self.ext}"
+                # Different names can end up with the same slug
+                if any(writer.path == path for writer in self.writers.values()):
+                    path = f"{self.stem}-{self.shard_by}-{slug}-{len(self.writers) + 1}{self.ext}"
+                title = f"GitHub Issues Report - {self.shard_by}: {key}"
+            else:
+                path = f"{self.stem}-{int(key):03d}{self.ext}"
+                title = f"GitHub Issues Report - page {key}"
+                # Fixed size pages are written one after another, close the previous one
+                for writer in self.writers.values():
+                    writer.close()
+            self.writers[key] = HtmlReportWriter(path, self.log, title).__enter__()
+        return self.writers[key]
+
+    def write_issue(self, issue):
+        pages = []
+        for key in self.shard_keys(issue):
+            writer = self.writer(key)
+            writer.write_issue(issue)
+            pages.append(os.path.basename(writer.path))
+        # Issues with several labels are on several pages, the search links the first one
+        entry = [issue.get('number'), issue['title'], issue['url'], pages[0],
+                 issue.get('labels') or [], issue.get('milestone')]
+        self.search_file.write(json.dumps(entry) + ",\n")
+        self.issue_count += 1
+
+    def write_index(self):
+        intro = (f'        <p class="mb-6 text-center text-gray-600">{self.issue_count} open issues '
+                 f'on {len(self.writers)} pages</p>\n'
+                 + SEARCH_SCRIPT % html.escape(os.path.basename(f"{self.stem}-search.js")))
+        column = self.shard_by.capitalize() if self.shard_by else "Page"
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(page_head("GitHub Issues Report", [column, "Issues", "Comments"], intro=intro))
+            for key, writer in self.writers.items():
+                f.write(table_row(f'<a href="{html.escape(os.path.basename(writer.path))}">{html.escape(key)}</a>',
+                                  writer.issues, writer.comments))
+            f.write(REPORT_TAIL)
+
+
+class HtmlExportWriter:
+    """The HTML report, sharded or not, fed with every completed page like the JSONL/Parquet exports.
+
+    Only the page being rendered is held in memory, however many issues the repository has.
+    The rendering time is summed up over the pages and logged when the report is closed.
+    """
+
+    def __init__(self, path, log, shard_size=None, shard_by=None):
+        log.debug("Writing HTML report to file...")
+        self.path = path
+        self.log = log
+        self.seconds = 0.0
+        if shard_size or shard_by:
+            self.writer = ShardedReportWriter(path, log, shard_size, shard_by)
+        else:
+            self.writer = HtmlReportWriter(path, log)
+        self.writer.__enter__()
+        self.closed = False
+
+    def write_issues(self, issues):
+        start_time = time.monotonic()
+        for issue in issues:
+            self.writer.write_issue(issue)
+        self.seconds += time.monotonic() - start_time
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        start_time = time.monotonic()
+        self.writer.__exit__(None, None, None)
+        self.seconds += time.monotonic() - start_time
+        metrics.record("render.html", self.seconds)
+        self.log.info(f"Report written to {self.path} in {self.seconds:.1f}s")
+
+
+def export_record(issue):
+    # The raw bodies are kept, the Pagure headers are only stripped for display
+    return dict(issue, comments=[comment for comment in issue['comments'] if not is_metadata_comment(comment['body'])])
+
+
+class JsonlExportWriter:
+    """One JSON object per line and issue, with its comments nested, appended as the pages come in."""
+
+    def __init__(self, path, log):
+        self.path = path
+        self.log = log
+        self.issues = 0
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write_issues(self, issues):
+        self.file.writelines(json.dumps(export_record(issue)) + "\n" for issue in issues)
+        self.file.flush()
+        self.issues += len(issues)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+            self.log.info(f"{self.issues} issues exported to {self.path}")
+
+
+class ParquetExportWriter:
+    """Issues and comments as two zstd compressed Parquet tables, written one row group at a time.
+
+    The comments table refers to the issues by number, so millions of comments load as plain
+    columns without going through the nested JSON.
+    """
+
+    ROW_GROUP_ISSUES = 10000
+
+    def __init__(self, stem, log):
+        # pyarrow is only needed for this format, main() checks it is installed
+        import pyarrow
+        import pyarrow.parquet
+        self.pa = pyarrow
+        self.log = log
+        self.issues = 0
+        self.comments = 0
+        timestamp = pyarrow.timestamp("s", tz="UTC")
+        self.issue_schema = pyarrow.schema([
+            ("number", pyarrow.int64()),
+            ("state", pyarrow.string()),
+            ("title", pyarrow.string()),
+            ("description", pyarrow.string()),
+            ("url", pyarrow.string()),
+            ("created_at", timestamp),
+            ("updated_at", timestamp),
+            ("labels", pyarrow.list_(pyarrow.string())),
+            ("milestone", pyarrow.string()),
+            ("comment_count", pyarrow.int32()),
+        ])
+        self.comment_schema = pyarrow.schema([
+            ("issue_number", pyarrow.int64()),
+            ("position", pyarrow.int32()),
+            ("body", pyarrow.string()),
+            ("created_at", timestamp),
+        ])
+        self.paths = (f"{stem}-issues.parquet", f"{stem}-comments.parquet")
+        self.path = self.paths[0]
+        self.issue_writer = pyarrow.parquet.ParquetWriter(self.paths[0], self.issue_schema, compression="zstd")
+        self.comment_writer = pyarrow.parquet.ParquetWriter(self.paths[1], self.comment_schema, compression="zstd")
+        self.issue_columns = {name: [] for name in self.issue_schema.names}
+        self.comment_columns = {name: [] for name in self.comment_schema.names}
+        self.closed = False
+
+    def write_issues(self, issues):
+        for issue in issues:
+            record = export_record(issue)
+            columns = self.issue_columns
+            for name in ("number", "state", "title", "description", "url", "labels", "milestone"):
+                columns[name].append(record[name])
+            columns["created_at"].append(datetime.fromisoformat(record["created_at"]))
+            columns["updated_at"].append(datetime.fromisoformat(record["updated_at"]))
+            columns["comment_count"].append(len(record["comments"]))
+            for position, comment in enumerate(record["comments"]):
+                self.comment_columns["issue_number"].append(record["number"])
+                self.comment_columns["position"].append(position)
+                self.comment_columns["body"].append(comment["body"])
+                self.comment_columns["created_at"].append(comment["created_at"] and datetime.fromisoformat(comment["created_at"]))
+            self.issues += 1
+            self.comments += len(record["comments"])
+        if len(self.issue_columns["number"]) >= self.ROW_GROUP_ISSUES:
+            self.flush()
+
+    def flush(self):
+        for writer, schema, columns in ((self.issue_writer, self.issue_schema, self.issue_columns),
+                                        (self.comment_writer, self.comment_schema, self.comment_columns)):
+            if columns[schema.names[0]]:
+                writer.write_table(self.pa.Table.from_pydict(columns, schema=schema))
+                for values in columns.values():
+                    values.clear()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        self.issue_writer.close()
+        self.comment_writer.close()
+        self.log.info(f"{self.issues} issues and {self.comments} comments exported to {self.paths[0]} and {self.paths[1]}")
+
+
+def open_exports(path, formats, log, shard_size=None, shard_by=None):
+    """Open the writers of the requested formats, the JSONL/Parquet ones named after the HTML report path."""
+    stem = os.path.splitext(path)[0]
+    writers = []
+    if "html" in formats:
+        writers.append(HtmlExportWriter(path, log, shard_size, shard_by))
+    if "jsonl" in formats:
+        writers.append(JsonlExportWriter(f"{stem}.jsonl", log))
+    if "parquet" in formats:
+        writers.append(ParquetExportWriter(stem, log))
+    export_writers.extend(writers)
+    return writers
+
+
+@metrics.stage("render.index")
+def create_index_page(stats, path, log, elapsed):
+    """Write the batch index: one row per repository with a link to its report and its timings."""
+    log.debug("Writing index page to file...")
+    intro = (f'        <p class="mb-6 text-center text-gray-600">{len(stats)} repositories, '
+             f'{sum(stat["issues"] or 0 for stat in stats)} open issues, fetched in {elapsed:.1f}s</p>\n')
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page_head("GitHub Issues Reports",
+                          ["Repository", "Open issues", "API requests", "Fetch time (s)", "Report time (s)"],
+                          intro=intro))
+        for stat in stats:
+            if stat.get('report'):
+                f.write(table_row(f'<a href="{html.escape(stat["report"])}">{html.escape(stat["repo"])}</a>',
+                                  stat['issues'], stat['requests'],
+                                  f"{stat['fetch_seconds']:.1f}", f"{stat['render_seconds']:.1f}"))
+            else:
+                f.write(table_row(html.escape(stat['repo']), "fetch failed", "", "", ""))
+        f.write(REPORT_TAIL)
+
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Issues are fetched in pages together with the first comments of every thread,
+# so a whole page costs a single request instead of one request per issue.
+GRAPHQL_ISSUES_QUERY = """
+query($owner: String!, $repo: String!, $pageSize: Int!, $commentsSize: Int!, $cursor: String,
+      $states: [IssueState!], $since: DateTime, $orderField: IssueOrderField!,
+      $labels: [String!], $assignee: String, $milestone: String) {
+  repository(owner: $owner, name: $repo) {
+    issues(states: $states, first: $pageSize, after: $cursor, orderBy: {field: $orderField, direction: ASC},
+           filterBy: {since: $since, labels: $labels, assignee: $assignee, milestoneNumber: $milestone}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number
+        state
+        title
+        body
+        url
+        createdAt
+        updatedAt
+        ISSUE_FIELDS
+        comments(first: $commentsSize) {
+          pageInfo { hasNextPage endCursor }
+          nodes { COMMENT_FIELDS }
+        }
+      }
+    }
+  }
+}
+"""
+
+# Optional fields of GRAPHQL_ISSUES_QUERY, left out with --minimal-fields
+GRAPHQL_ISSUE_FIELDS = {
+    'labels': "labels(first: 20) { nodes { name } }",
+    'milestone': "milestone { title }",
+    'assignees': "assignees(first: 10) { nodes { login } }",
+}
+
+# Only used for the threads that did not fit into the inline comments page
+GRAPHQL_COMMENTS_QUERY = """
+query($owner: String!, $repo: String!, $number: Int!, $cursor: String) {
+  repository(owner: $owner, name: $repo) {
+    issue(number: $number) {
+      comments(first: 100, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { COMMENT_FIELDS }
+      }
+    }
+  }
+}
+"""
+
+
+class QuotaTracker:
+    """Live view of the API quota, fed from the X-RateLimit-* headers of responses we already receive.
+
+    REST and GraphQL have separate budgets, so they are tracked per resource. Instead of waiting
+    for RateLimitExceededException, pace() spreads the remaining requests until the reset once the
+    budget runs low, and parks every caller until the reset when only the reserve is left.
+    """
+
+    def __init__(self, log, reserve=20, slow_down_ratio=0.1):
+        self.log = log
+        self.reserve = reserve
+        self.slow_down_ratio = slow_down_ratio
+        self.lock = threading.Lock()
+        # resource -> (remaining, limit, reset timestamp)
+        self.budgets = {}
+        # resource -> earliest time the next request may start
+        self.next_request = {}
+        # Set when GitHub asks us to back off, every resource waits until then
+        self.held_until = 0
+
+    def observe(self, resource, remaining, limit, reset):
+        with self.lock:
+            known = self.budgets.get(resource)
+            # Within one window the quota only goes down, a higher value comes from an older response
+            if known and known[2] == reset and known[0] < remaining:
+                return
+            self.budgets[resource] = (remaining, limit, reset)
+
+    def update(self, headers):
+        if "X-RateLimit-Remaining" not in headers or "X-RateLimit-Reset" not in headers:
+            return
+        self.observe(headers.get("X-RateLimit-Resource", "core"),
+                     int(headers["X-RateLimit-Remaining"]),
+                     int(headers.get("X-RateLimit-Limit", 0)),
+                     int(headers["X-RateLimit-Reset"]))
+
+    def exhausted(self, resource, reset):
+        with self.lock:
+            limit = self.budgets.get(resource, (0, 0, 0))[1]
+            self.budgets[resource] = (0, limit, reset)
+
+    def hold(self, seconds):
+        with self.lock:
+            self.held_until = max(self.held_until, time.time() + seconds)
+
+    def remaining(self, resource="core"):
+        return self.budgets.get(resource, (None, None, None))[0]
+
+    def reset_time(self, resource="core"):
+        return self.budgets.get(resource, (None, None, 0))[2]
+
+    def pace(self, resource="core"):
+        with self.lock:
+            now = time.time()
+            # A pending wait for the reset applies to every caller
+            slot = max(now, self.held_until, self.next_request.get(resource, 0))
+            if resource in self.budgets:
+                remaining, limit, reset = self.budgets[resource]
+                if reset > now and remaining <= self.reserve:
+                    slot = max(slot, reset + 1)
+                    self.next_request[resource] = slot
+                    # Assume a fresh window after the reset, the next response corrects it
+                    self.budgets[resource] = (limit, limit, reset)
+                    self.log.info(f"API quota almost used ({remaining} left), waiting {int(slot - now)} seconds for the reset...")
+                elif reset > now and remaining < limit * self.slow_down_ratio:
+                    # Spread what is left evenly until the reset, shared by every worker thread
+                    self.next_request[resource] = slot + (reset - now) / (remaining - self.reserve)
+        delay = slot - time.time()
+        if delay > 0:
+            metrics.sleep(f"pace.{resource}", delay)
+
+
+class GithubClient:
+    """Small requests based client for the GitHub API calls PyGithub does not batch.
+
+    One pooled session and one quota budget are shared by all the worker threads,
+    and by the clients created with share().
+    """
+
+    def __init__(self, api_key, log, base_url=GITHUB_API_URL, pool_size=1, session=None, quota=None):
+        self.log = log
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                "Authorization": f"Bearer {api_key}",
+                "Accept": "application/vnd.github+json",
             })
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self.lock = threading.Lock()
+        self.requests_made = 0
+        self.quota = quota or QuotaTracker(log)
+
+    def share(self):
+        """Return a client on the same session and quota budget that counts its own requests."""
+        return GithubClient(self.api_key, self.log, self.base_url, session=self.session, quota=self.quota)
+
+    def request(self, method, url, **kwargs):
+        if not url.startswith("http"):
+            url = f"{self.base_url}{url}"
+        resource = "graphql" if url.endswith("/graphql") else "core"
+        while True:
+            self.quota.pace(resource)
+            with metrics.stage(f"http.{resource}"):
+                response = self.session.request(method, url, **kwargs)
+            metrics.count('http_calls')
+            metrics.count('bytes_received', len(response.content))
+            with self.lock:
+                self.requests_made += 1
+            headers = response.headers
+            self.quota.update(headers)
+            if response.status_code in (403, 429) and headers.get("X-RateLimit-Remaining") != "0" \
+                    and ("Retry-After" in headers or "secondary rate limit" in response.text):
+                # Secondary rate limit, GitHub tells us how long to back off
+                retry_after = int(headers.get("Retry-After", 60))
+                metrics.count('secondary_rate_limits')
+                self.log.error(f"Secondary rate limit hit, pausing requests for {retry_after} seconds...")
+                self.quota.hold(retry_after)
+                continue
+            if response.status_code in (403, 429) and headers.get("X-RateLimit-Remaining") == "0":
+                # Somebody else used the quota up, wait for the reset and retry
+                metrics.count('rate_limits')
+                self.quota.exhausted(resource, int(headers.get("X-RateLimit-Reset", time.time() + 60)))
+                continue
+            try:
+                data = response.json()
+            except ValueError:
+                data = {"message": response.text}
+            if response.status_code != 200:
+                raise GithubException(response.status_code, data, dict(headers))
+            return data, response
+
+    def paginate(self, path, params=None):
+        """Yield the pages of a REST list, the caller can stop before the last one."""
+        url = path
+        while url:
+            data, response = self.request("GET", url, params=params)
+            yield data
+            # The next link already carries the query parameters
+            url = response.links.get("next", {}).get("url")
+            params = None
+
+    def get_paginated(self, path, params=None):
+        return [item for page in self.paginate(path, params) for item in page]
+
+    def graphql(self, query, variables):
+        # GitHub Enterprise serves REST under /api/v3 but GraphQL under /api/graphql
+        url = f"{self.base_url[:-3]}graphql" if self.base_url.endswith("/api/v3") else "/graphql"
+        while True:
+            data, response = self.request("POST", url, json={"query": query, "variables": variables})
+            if not data.get("errors"):
+                return data["data"]
+            if any(error.get("type") == "RATE_LIMITED" for error in data["errors"]):
+                self.quota.exhausted("graphql", int(response.headers.get("X-RateLimit-Reset", time.time() + 60)))
+                continue
+            raise GithubException(response.status_code, data, dict(response.headers))
+
+
+class IssueCache:
+    """SQLite store of the open issues of each owner/repo, kept fresh with since= delta syncs."""
+
+    def __init__(self, path, repo_key, log):
+        self.log = log
+        self.path = path
+        self.repo_key = repo_key
+        # Batch runs open one connection per repository thread on the same file
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("CREATE TABLE IF NOT EXISTS issues ("
+                        "repo TEXT NOT NULL, number INTEGER NOT NULL, created_at TEXT NOT NULL, data TEXT NOT NULL, "
+                        "PRIMARY KEY (repo, number))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS sync (repo TEXT PRIMARY KEY, last_sync TEXT NOT NULL)")
+        self.db.commit()
+
+    def last_sync(self):
+        row = self.db.execute("SELECT last_sync FROM sync WHERE repo = ?", (self.repo_key,)).fetchone()
+        return row[0] if row else None
+
+    def merge(self, issues):
+        """Store a page of fetched open issues and evict the ones that were closed since the last sync."""
+        with self.db:
+            for issue in issues:
+                if issue['state'] == 'open':
+                    self.db.execute("INSERT OR REPLACE INTO issues (repo, number, created_at, data) VALUES (?, ?, ?, ?)",
+                                    (self.repo_key, issue['number'], issue['created_at'], json.dumps(issue)))
+                else:
+                    self.db.execute("DELETE FROM issues WHERE repo = ? AND number = ?", (self.repo_key, issue['number']))
+                    self.log.debug(f"Issue evicted from cache: {issue['title']}")
+
+    def mark_synced(self, updated_at):
+        """Move the sync mark forward once a fetch completed, otherwise the next run asks for the same window again.
+
+        updated_at comes from GitHub, so the mark does not depend on the local clock.
+        """
+        last_sync = max(self.last_sync() or '', updated_at or '') or None
+        if last_sync:
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO sync (repo, last_sync) VALUES (?, ?)", (self.repo_key, last_sync))
 
-    issues_df = pd.DataFrame(issues_data)
-
-    log.debug("Adding Tailwind CSS classes to HTML tables...")
-    def add_table_classes(html_string):
-        html_string = html_string.replace(
-            "<table>",
-            # Added table-fixed for predictable column widths
-            '<table class="min-w-full table-fixed divide-y divide-gray-200 border border-gray-300 shadow-md rounded-lg">'
-        )
-        html_string = html_string.replace(
-            "<thead>",
-            '<thead class="bg-gray-100">'
-        )
-        html_string = html_string.replace(
-            "<th>",
-            '<th class="px-6 py-3 text-left text-xs font-medium text-gray-600 uppercase tracking-wider border-b border-gray-300">'
-        )
-        html_string = html_string.replace(
-            "<td>",
-            # Removed max-w-xl, relying on CSS for column widths; kept break-words and align-top
-            '<td class="px-6 py-4 text-sm text-gray-700 border-b border-gray-300 break-words align-top">'
-        )
-        return html_string
-
-    log.debug("Generate HTML tables from dataframes...")
-    issues_html = add_table_classes(issues_df.to_html(index=False, escape=False))
-
-    log.debug("Combining HTML tables into one HTML file...")
-    html_report = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <script src="https://cdn.tailwindcss.com"></script>
-        <title>GitHub Issues Report</title>
-        <style>
-            /* For alternating row colors */
-            tbody tr:nth-child(odd) {{
-                background-color: #ffffff; /* white */
-            }}
-            tbody tr:nth-child(even) {{
-                background-color: #f8f9fa; /* lighter gray */
-            }}
-            /* Ensure links within table cells are styled nicely */
-            td a {{
-                color: #007bff; /* Link color */
-                text-decoration: none;
-            }}
-            td a:hover {{
-                text-decoration: underline;
-            }}
-            /* Column widths - applied because 'table-fixed' is on the table */
-            thead th:nth-child(1), tbody td:nth-child(1) {{ width: 30%; }} /* Title (URL) - wider */
-            thead th:nth-child(2), tbody td:nth-child(2) {{ width: 35%; }} /* Description */
-            thead th:nth-child(3), tbody td:nth-child(3) {{ width: 35%; }} /* Comments */
-        </style>
-    </head>
-    <body class="bg-gray-50 p-8">
-        <div class="container mx-auto bg-white shadow-lg rounded-lg p-6">
-            <h1 class="text-4xl font-bold mb-6 text-center text-gray-800">GitHub Issues Report</h1>
-            {issues_html}
-        </div>
-    </body>
-    </html>
+    def pages(self, size=500):
+        """The cached issues in creation order, `size` at a time so they are never all loaded at once."""
+        rows = self.db.execute("SELECT data FROM issues WHERE repo = ? ORDER BY created_at, number", (self.repo_key,))
+        while True:
+            page = [json.loads(data) for data, in rows.fetchmany(size)]
+            if not page:
+                return
+            yield page
+
+
+class FetchCheckpoint:
+    """Append-only JSONL record of the completed pages of a fetch.
+
+    The first line describes the fetch (repo, mode, since), every following line holds one
+    page of issues and the cursor of the next page. Appending keeps the cost per page flat,
+    and a line cut short by a crash is simply ignored on load.
     """
 
-    log.debug("Writing HTML report to file...")
-    with open("github_report.html", "w") as f:
-        f.write(html_report)
+    def __init__(self, path, log):
+        self.path = path
+        self.log = log
+        self.file = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding="utf-8") as f:
+            lines = f.readlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return None
+        cursor = None
+        issues = []
+        for line in lines[1:]:
+            try:
+                page = json.loads(line)
+            except ValueError:
+                break
+            cursor = page['cursor']
+            issues += page['issues']
+        return header, cursor, issues
+
+    def start(self, header):
+        self.file = open(self.path, "w", encoding="utf-8")
+        self.write(header)
+
+    def resume(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def save_page(self, cursor, issues):
+        self.write({'cursor': cursor, 'issues': issues})
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def remove(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@metrics.stage("connect")
+def connect(api_key, log, pool_size=1, base_url=GITHUB_API_URL):
+    """Authenticate and check the quota once, the returned API objects are shared by every worker."""
+    api = Github(api_key, base_url=base_url, per_page=100)
+    client = GithubClient(api_key, log, base_url, pool_size=pool_size)
+    try:
+        overview = api.get_rate_limit()
+        metrics.count('http_calls')
+        # PyGithub 2.4+ moved the per-resource limits under .resources
+        rate_limit = overview.resources.core if hasattr(overview, "resources") else overview.core
+        client.requests_made += 1
+        client.quota.observe("core", rate_limit.remaining, rate_limit.limit, int(rate_limit.reset.timestamp()))
+        log.debug(f"Rate limit remaining: {rate_limit.remaining}")
+        if rate_limit.remaining <= 0:
+            log.error("GitHub API rate limit has been reached. Exiting...")
+            sys.exit(1)
+    except GithubException as e:
+        log.error(f"Error fetching data from Github: {str(e)}")
+        sys.exit(1)
+    return api, client
 
 
 class GithubWorker:
-    def __init__(self, owner, repo, api_key, log):
+    def __init__(self, owner, repo, api, client, log, fetch_mode="rest", page_size=50, first_comments=50, cache=None,
+                 workers=1, checkpoint=None, filters=None, minimal_fields=False, exports=None):
         self.log = log
-        self.api = Github(api_key)
+        self.owner = owner
+        self.repo_name = repo
+        self.fetch_mode = fetch_mode
+        self.page_size = page_size
+        self.first_comments = first_comments
+        self.cache = cache
+        self.workers = workers
+        self.checkpoint = checkpoint
+        # See filters_from_args(), labels/milestone/assignee/updated_after go into the API query of a full
+        # fetch, a delta sync checks them in filter_issue() so it also sees the issues that stopped matching
+        self.filters = filters or {}
+        # Field projection of the GraphQL issues query, plus whatever the filters are checked on
+        issue_fields = [] if minimal_fields else ['labels', 'milestone']
+        for name, field in (('labels', 'labels'), ('milestone', 'milestone'), ('assignee', 'assignees')):
+            if self.filters.get(name) and field not in issue_fields:
+                issue_fields.append(field)
+        self.comment_fields = "body" if minimal_fields else "body createdAt"
+        self.minimal_fields = minimal_fields
+        self.issues_query = (GRAPHQL_ISSUES_QUERY
+                             .replace("ISSUE_FIELDS", "\n        ".join(GRAPHQL_ISSUE_FIELDS[field] for field in issue_fields))
+                             .replace("COMMENT_FIELDS", self.comment_fields))
+        self.comments_query = GRAPHQL_COMMENTS_QUERY.replace("COMMENT_FIELDS", self.comment_fields)
+        self.milestone = None
+        # HTML/JSONL/Parquet writers fed with every completed page, see open_exports()
+        self.exports = exports or []
+        # The pages are passed on as they complete, only the numbers and counts are kept
+        self.known = set()
+        self.fetched = 0
+        # Cache runs: open issues refreshed, newest updated_at for the sync mark, exports fed yet
+        self.refreshed = 0
+        self.last_updated = None
+        self.exported = False
+        self.api = api
+        self.client = client
+        # Requests issued through PyGithub, the client keeps its own count
+        self.requests_made = 0
+        # Cursor of the next page to fetch: a page index in REST mode, an endCursor in GraphQL mode
+        self.cursor = None
+        # Set once every page of the current fetch has been collected
+        self.complete = False
+        self.stats = {'repo': f"{owner}/{repo}", 'issues': 0, 'requests': 0, 'fetch_seconds': 0.0}
         self.log.debug("Initialising GithubWorker...")
         try:
-            rate_limit = self.api.get_rate_limit().core.remaining
-            self.log.debug(f"Rate limit remaining: {rate_limit}")
-            if rate_limit <= 0:
-                self.log.error("GitHub API rate limit has been reached. Exiting...")
-                sys.exit(1)
             self.log.debug("Fetching repo and issues data from Github...")
             self.repo = self.api.get_repo(f"{owner}/{repo}")
-            self.issues = self.repo.get_issues(state="open", sort="created", direction="asc")
+            self.requests_made += 1
+            metrics.count('http_calls')
             #self.milestones = self.repo.get_milestones()
         except GithubException as e:
             self.log.error(f"Error fetching data from Github: {str(e)}")
             sys.exit(1)
 
-    def get_issues(self):
+    def get_issues(self, resume=False):
         self.log.debug("Creating issues and milestones JSON...")
-        report_data['issues'] = []
+        header = {
+            'repo': f"{self.owner}/{self.repo_name}",
+            'mode': self.fetch_mode,
+            'filters': filter_key(self.filters),
+            'fields': "minimal" if self.minimal_fields else None,
+            'since': self.cache.last_sync() if self.cache else None,
+        }
+        saved = self.checkpoint.load() if self.checkpoint and resume else None
+        if saved:
+            saved_header, self.cursor, saved_issues = saved
+            if [saved_header.get(key) for key in ('repo', 'mode', 'filters', 'fields')] != [header[key] for key in ('repo', 'mode', 'filters', 'fields')]:
+                self.log.error(f"Checkpoint {self.checkpoint.path} belongs to a {saved_header['mode']} fetch of "
+                               f"{saved_header['repo']} with other filters or fields, it cannot be resumed for this run")
+                sys.exit(1)
+            header = saved_header
+            self.checkpoint.resume()
+            self.log.info(f"Resuming fetch with {len(saved_issues)} issues from {self.checkpoint.path}")
+            self.store_page(saved_issues)
+        elif self.checkpoint:
+            if resume:
+                self.log.info(f"No checkpoint found at {self.checkpoint.path}, starting a new fetch")
+            self.checkpoint.start(header)
+        # A delta sync of the cache also returns closed issues, so they can be evicted
+        delta = bool(header['since'])
+        since = max(filter(None, [header['since'], self.filters.get('updated_after') and self.filters['updated_after'].isoformat()]),
+                    default=None)
+        if since:
+            self.log.debug(f"Fetching issues updated since {since}")
+        start_time = time.monotonic()
+        while not self.complete:
+            try:
+                if self.filters.get('milestone') and self.milestone is None:
+                    self.milestone = self.resolve_milestone(self.filters['milestone'])
+                if self.fetch_mode == "graphql":
+                    self.get_issues_graphql(since, delta)
+                else:
+                    self.get_issues_rest(since, delta)
+                self.complete = True
+            except RateLimitExceededException as e:
+                # Continue from the last completed page once the quota is back
+                self.log.error(f"Rate limit exceeded error: {str(e)}")
+                resource = "graphql" if self.fetch_mode == "graphql" else "core"
+                time_to_reset = max(self.api.rate_limiting_resettime, self.client.quota.reset_time(resource)) - int(time.time())
+                if time_to_reset > 0:
+                    self.log.error(f"Waiting {time_to_reset} seconds before trying again...")
+                    metrics.sleep("rate_limit_reset", time_to_reset)
+            except GithubException as e:
+                self.log.error(f"Error fetching issues or milestones: {str(e)}")
+                sys.exit(1)
+        elapsed = time.monotonic() - start_time
+        metrics.record("fetch", elapsed)
+        requests_made = self.requests_made + self.client.requests_made
+        self.log.info(f"Fetched {self.fetched} issues of {self.owner}/{self.repo_name} in {elapsed:.1f}s "
+                      f"using {requests_made} API requests ({self.fetch_mode})")
+        issue_count = self.fetched
+        if self.cache:
+            if self.complete:
+                self.cache.mark_synced(self.last_updated)
+            # Only the merged cache holds the whole issue list, the delta pages were not exported
+            self.exported = True
+            issue_count = 0
+            for page in self.cache.pages():
+                self.export(page)
+                issue_count += len(page)
+            # Issues served from the cache without asking GitHub for them again
+            metrics.count('cache_hits', issue_count - self.refreshed)
+            metrics.count('cache_refreshed', self.refreshed)
+            self.log.info(f"{issue_count} open issues in the cache")
+        self.stats.update(issues=issue_count, requests=requests_made, fetch_seconds=elapsed)
+        if self.checkpoint:
+            self.checkpoint.remove()
+        self.log.debug("JSON completed.")
+
+    def save_page(self, cursor, issues):
+        self.cursor = cursor
+        metrics.count('issues_fetched', len(issues))
+        if self.checkpoint:
+            with metrics.stage("checkpoint.save"):
+                self.checkpoint.save_page(cursor, issues)
+        self.store_page(issues)
+
+    def store_page(self, issues):
+        """Pass a page on: merged into the cache when there is one, straight to the exports otherwise."""
+        self.fetched += len(issues)
+        self.known.update(issue['number'] for issue in issues)
+        if self.cache:
+            self.refreshed += sum(1 for issue in issues if issue['state'] == 'open')
+            self.last_updated = max([self.last_updated or ''] + [issue['updated_at'] for issue in issues]) or None
+            with metrics.stage("cache.merge"):
+                self.cache.merge(issues)
+        else:
+            self.export(issues)
+
+    def interrupt(self):
+        """Ctrl+C: a cache run exports after the fetch, give the exports what the cache holds so far."""
+        if not self.cache or self.exported:
+            return
+        self.exported = True
+        try:
+            # The signal handler runs on the main thread, batch workers opened their cache on their own
+            cache = IssueCache(self.cache.path, self.cache.repo_key, self.log)
+            for page in cache.pages():
+                self.export(page)
+        except sqlite3.Error as e:
+            self.log.error(f"Could not read the cache of {self.owner}/{self.repo_name}: {e}")
+
+    def export(self, issues):
+        if self.exports:
+            with metrics.stage("export"):
+                for writer in self.exports:
+                    writer.write_issues(issues)
+
+    def resolve_milestone(self, milestone):
+        """Milestone filters need the milestone object (REST) or its number (GraphQL)."""
+        if milestone in ("*", "none"):
+            return milestone
+        if milestone.isdigit():
+            self.requests_made += 1
+            metrics.count('http_calls')
+            return self.repo.get_milestone(int(milestone))
+        self.requests_made += 1
+        metrics.count('http_calls')
+        for candidate in self.repo.get_milestones(state="all"):
+            if candidate.title == milestone:
+                return candidate
+        self.log.error(f"Milestone {milestone} not found in {self.owner}/{self.repo_name}")
+        sys.exit(1)
+
+    def filter_issue(self, issue_data, delta, assignees=None):
+        """Apply the filters the API cannot: returns (keep, stop).
+
+        The lists are sorted by creation date (updated date for a delta sync), so once an issue
+        is past the matching "before" bound no later issue can match and the fetch stops there.
+        A delta sync does not send the label, milestone and assignee filters to the API, they
+        are checked here on the logins in `assignees`.
+        """
+        filters = self.filters
+        created = datetime.fromisoformat(issue_data['created_at'])
+        updated = datetime.fromisoformat(issue_data['updated_at'])
+        order_date, order_limit = (updated, filters.get('updated_before')) if delta else (created, filters.get('created_before'))
+        if order_limit and order_date >= order_limit:
+            return False, True
+        if filters.get('created_after') and created < filters['created_after']:
+            return False, False
+        if filters.get('created_before') and created >= filters['created_before']:
+            return False, False
+        if filters.get('updated_before') and updated >= filters['updated_before']:
+            return False, False
+        # GraphQL matches any of the labels, the REST API and --label mean all of them
+        if filters.get('labels') and not set(filters['labels']) <= set(issue_data.get('labels') or []):
+            return False, False
+        if self.milestone == "*" and not issue_data['milestone']:
+            return False, False
+        if self.milestone == "none" and issue_data['milestone']:
+            return False, False
+        if self.milestone not in (None, "*", "none") and issue_data['milestone'] != self.milestone.title:
+            return False, False
+        assignee = filters.get('assignee')
+        if assignee == "*" and not assignees:
+            return False, False
+        if assignee == "none" and assignees:
+            return False, False
+        if assignee not in (None, "*", "none") and assignee.lower() not in (login.lower() for login in assignees or []):
+            return False, False
+        return True, False
+
+    def get_issues_rest(self, since=None, delta=False):
+        query = {}
+        # An issue that lost its label, milestone or assignee is not in the filtered list anymore,
+        # a delta sync has to see it to evict it from the cache
+        if self.filters.get('labels') and not delta:
+            query['labels'] = self.filters['labels']
+        if self.filters.get('assignee') and not delta:
+            query['assignee'] = self.filters['assignee']
+        if self.milestone and not delta:
+            query['milestone'] = self.milestone
+        if since:
+            query['since'] = datetime.fromisoformat(since)
+        if delta:
+            # Closed issues are part of the delta so they can be evicted from the cache
+            issues = self.repo.get_issues(state="all", sort="updated", direction="asc", **query)
+        else:
+            issues = self.repo.get_issues(state="open", sort="created", direction="asc", **query)
+        page = self.cursor or 0
+        if page:
+            # Closing an issue shifts the later ones up the list, so the last completed page is
+            # fetched again and the issues we already have are skipped
+            page -= 1
+        executor = ThreadPoolExecutor(max_workers=self.workers)
         try:
-            for issue in self.issues:
+            while True:
+                with metrics.stage("rest.issues_page"):
+                    batch = issues.get_page(page)
+                # PyGithub pages do not go through GithubClient, their bytes are not counted
+                metrics.count('http_calls')
+                self.requests_made += 1
+                # PyGithub keeps the quota headers of the page it just fetched
+                remaining, limit = self.api.rate_limiting
+                self.client.quota.observe("core", remaining, limit, self.api.rate_limiting_resettime)
+                # Comment threads of the page are fetched by the pool and collected in page order
+                pending = []
+                stop = False
+                for issue in batch:
+                    if issue.number in self.known:
+                        continue
+                    issue_data = {
+                        'number': issue.number,
+                        'state': issue.state,
+                        'title': issue.title,
+                        'description': issue.body,
+                        'url': issue.html_url,
+                        'created_at': issue.created_at.isoformat(),
+                        'updated_at': issue.updated_at.isoformat(),
+                        'labels': [label.name for label in issue.labels],
+                        'milestone': issue.milestone.title if issue.milestone else None,
+                        'comments': [],
+                    }
+                    assignees = [user.login for user in issue.assignees] if self.filters.get('assignee') else None
+                    keep, stop = self.filter_issue(issue_data, delta, assignees)
+                    if stop:
+                        break
+                    if not keep:
+                        if delta:
+                            # No longer matches the filters, evict it from the cache
+                            issue_data['state'] = 'filtered'
+                            pending.append((issue_data, None))
+                        continue
+                    comments = executor.submit(self.get_comments, issue.number) if issue.state == 'open' else None
+                    pending.append((issue_data, comments))
+                page_issues = [self.collect_issue(*item) for item in pending]
+                page += 1
+                self.save_page(page, page_issues)
+                if stop or len(batch) < self.api.per_page:
+                    break
+                self.client.quota.pace("core")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @metrics.stage("rest.comments")
+    def get_comments(self, number):
+        limit = self.filters.get('max_comments')
+        comments = []
+        for page in self.client.paginate(f"/repos/{self.owner}/{self.repo_name}/issues/{number}/comments",
+                                         {"per_page": min(limit or 100, 100)}):
+            # Keep the timestamps in the same isoformat() shape PyGithub produces
+            comments += [{'body': comment['body'], 'created_at': comment['created_at'].replace('Z', '+00:00')}
+                         for comment in page if not is_metadata_comment(comment['body'])]
+            if limit is not None and len(comments) >= limit:
+                break
+        return comments[:limit]
+
+    def collect_issue(self, issue_data, comments):
+        if comments is not None:
+            issue_data['comments'] = comments.result()
+        self.log.debug(f"Issue fetched: {issue_data['title']}")
+        self.log.debug(f"Rate limit remaining: {self.client.quota.remaining('core')}")
+        return issue_data
+
+    def get_issues_graphql(self, since=None, delta=False):
+        limit = self.filters.get('max_comments')
+        milestone = self.milestone if self.milestone in (None, "*", "none") else str(self.milestone.number)
+        while True:
+            data = self.client.graphql(self.issues_query, {
+                "owner": self.owner,
+                "repo": self.repo_name,
+                "pageSize": self.page_size,
+                "commentsSize": min(self.first_comments, limit) if limit is not None else self.first_comments,
+                "cursor": self.cursor,
+                # Closed issues are part of the delta so they can be evicted from the cache
+                "states": ["OPEN", "CLOSED"] if delta else ["OPEN"],
+                "since": since,
+                "orderField": "UPDATED_AT" if delta else "CREATED_AT",
+                # See get_issues_rest(), a delta sync checks these in filter_issue()
+                "labels": None if delta else self.filters.get('labels'),
+                "assignee": None if delta else self.filters.get('assignee'),
+                "milestone": None if delta else milestone,
+            })
+            issues = data["repository"]["issues"]
+            page_issues = []
+            stop = False
+            for node in issues["nodes"]:
+                state = node['state'].lower()
+                # Keep the timestamps in the same isoformat() shape the REST path produces
                 issue_data = {
-                    'title': issue.title,
-                    'description': issue.body,
-                    'url': issue.html_url,
-                    'comments': [{'body': comment.body, 'created_at': comment.created_at.isoformat()} for comment in issue.get_comments()]
+                    'number': node['number'],
+                    'state': state,
+                    'title': node['title'],
+                    'description': node['body'],
+                    'url': node['url'],
+                    'created_at': node['createdAt'].replace('Z', '+00:00'),
+                    'updated_at': node['updatedAt'].replace('Z', '+00:00'),
+                    'labels': [label['name'] for label in node['labels']['nodes']] if 'labels' in node else [],
+                    'milestone': node['milestone']['title'] if node.get('milestone') else None,
+                    'comments': [],
                 }
-                report_data['issues'].append(issue_data)
+                assignees = [user['login'] for user in node['assignees']['nodes']] if 'assignees' in node else None
+                keep, stop = self.filter_issue(issue_data, delta, assignees)
+                if stop:
+                    break
+                if not keep:
+                    if not delta:
+                        continue
+                    # No longer matches the filters, evict it from the cache
+                    issue_data['state'] = 'filtered'
+                elif state == 'open':
+                    comments = [comment for comment in node["comments"]["nodes"] if not is_metadata_comment(comment['body'])]
+                    if node["comments"]["pageInfo"]["hasNextPage"] and (limit is None or len(comments) < limit):
+                        comments += self.get_remaining_comments(node["number"], node["comments"]["pageInfo"]["endCursor"],
+                                                                None if limit is None else limit - len(comments))
+                    issue_data['comments'] = [{'body': comment['body'],
+                                               'created_at': comment.get('createdAt') and comment['createdAt'].replace('Z', '+00:00')}
+                                              for comment in comments[:limit]]
+                page_issues.append(issue_data)
                 self.log.debug(f"Issue fetched: {issue_data['title']}")
-                rate_limit = self.api.get_rate_limit().core.remaining
-                self.log.debug(f"Rate limit remaining: {rate_limit}")
-        except RateLimitExceededException as e:
-            self.log.error(f"Rate limit exceeded error: {str(e)}")
-            time_to_reset = self.api.rate_limiting_resettime - int(time.time())
-            if time_to_reset > 0:
-                self.log.error(f"Waiting {time_to_reset} seconds before trying again...")
-                time.sleep(time_to_reset)
-        except GithubException as e:
-            self.log.error(f"Error fetching issues or milestones: {str(e)}")
+            self.save_page(issues["pageInfo"]["endCursor"], page_issues)
+            if stop or not issues["pageInfo"]["hasNextPage"]:
+                break
+
+    @metrics.stage("graphql.comments")
+    def get_remaining_comments(self, number, cursor, limit=None):
+        comments = []
+        while cursor and (limit is None or len(comments) < limit):
+            data = self.client.graphql(self.comments_query, {
+                "owner": self.owner,
+                "repo": self.repo_name,
+                "number": number,
+                "cursor": cursor,
+            })
+            page = data["repository"]["issue"]["comments"]
+            comments += [comment for comment in page["nodes"] if not is_metadata_comment(comment['body'])]
+            cursor = page["pageInfo"]["endCursor"] if page["pageInfo"]["hasNextPage"] else None
+        return comments
+
+
+def parse_repo(repo_input):
+    """Return (owner, repo) from a user/repo string or a full GitHub URL."""
+    # Handle both full GitHub URLs and user/repo format
+    repo_input = repo_input.strip()
+
+    if repo_input.startswith('https://github.com/') or repo_input.startswith('http://github.com/'):
+        # Extract owner/repo from full URL
+        # Remove the protocol and domain
+        path_part = repo_input.split('github.com/')[-1]
+        # Remove any trailing slashes or .git extension
+        path_part = path_part.rstrip('/').rstrip('.git')
+
+        if "/" in path_part:
+            owner, repo = path_part.split("/", 1)  # Split only on first '/'
+        else:
+            log.error("Invalid GitHub URL format. Expected: https://github.com/user/repo")
             sys.exit(1)
+    elif "/" in repo_input:
+        # Handle user/repo format
+        parts = repo_input.split("/")
+        if len(parts) == 2:
+            owner, repo = parts
+        else:
+            log.error("Invalid GitHub repo format. Expected: user/repo or https://github.com/user/repo")
+            sys.exit(1)
+    else:
+        log.error("Invalid GitHub repo format. Expected: user/repo or https://github.com/user/repo")
+        sys.exit(1)
 
-        self.log.debug("JSON completed.")
+    log.debug("GitHub repo: %s/%s" % (owner, repo))
+    return owner, repo
+
+
+def org_repos(api, org, log):
+    log.debug(f"Listing repositories of {org}...")
+    try:
+        return [(org, repo.name) for repo in api.get_organization(org).get_repos()
+                if not repo.archived and repo.has_issues and repo.open_issues_count > 0]
+    except GithubException as e:
+        log.error(f"Error listing the repositories of {org}: {str(e)}")
+        sys.exit(1)
+
+
+def repo_checkpoint_path(path, owner, repo):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-{owner}_{repo}{ext}"
+
+
+def filters_from_args(args):
+    """Collect the issue filters of the command line, the dates become aware datetimes."""
+    filters = {
+        'labels': args.label,
+        'milestone': args.milestone,
+        'assignee': args.assignee,
+        'max_comments': args.max_comments,
+    }
+    for name in ('created_after', 'created_before', 'updated_after', 'updated_before'):
+        value = getattr(args, name)
+        if value:
+            try:
+                date = datetime.fromisoformat(value)
+            except ValueError:
+                log.error(f"--{name.replace('_', '-')} expects an ISO date, got {value}")
+                sys.exit(1)
+            # Dates without a timezone are taken as UTC, like the GitHub API does
+            filters[name] = date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+    return {name: value for name, value in filters.items() if value is not None}
+
+
+def filter_key(filters):
+    """Stable text form of the filters, cached issues and checkpoints only match the same filters."""
+    return "&".join(f"{name}={','.join(sorted(value)) if isinstance(value, list) else value.isoformat() if isinstance(value, datetime) else value}"
+                    for name, value in sorted(filters.items()))
+
+
+def cache_key(owner, repo, fetch_mode, filters, minimal_fields=False):
+    """Cache entry of a repository, REST results include pull requests and GraphQL ones do not, keep them apart."""
+    key = filter_key(filters)
+    if minimal_fields:
+        # Minimal rows have no labels, milestones or comment dates, a full run must not reuse them
+        key = "&".join(filter(None, [key, "fields=minimal"]))
+    return f"{owner}/{repo}@{fetch_mode}?{key}" if key else f"{owner}/{repo}@{fetch_mode}"
+
+
+def run_batch(repos, api, client, args, log):
+    """Fetch several repositories at once over the shared session and quota, one report each plus an index."""
+    os.makedirs(args.output_dir, exist_ok=True)
+    filters = filters_from_args(args)
+
+    def fetch_repo(owner, repo):
+        path = os.path.join(args.output_dir, f"{owner}_{repo}.html")
+        cache = IssueCache(args.cache, cache_key(owner, repo, args.fetch_mode, filters, args.minimal_fields), log) if args.cache else None
+        checkpoint = FetchCheckpoint(repo_checkpoint_path(args.checkpoint, owner, repo), log)
+        exports = open_exports(path, report_formats, log, **report_options)
+        try:
+            gh = GithubWorker(owner, repo, api, client.share(), log, args.fetch_mode, args.page_size,
+                              args.first_comments, cache, args.workers, checkpoint, filters, args.minimal_fields,
+                              exports)
+            workers.append(gh)
+            gh.get_issues(args.resume)
+        except SystemExit:
+            # The worker already logged why, the other repositories carry on
+            log.error(f"Skipping {owner}/{repo}, its issues could not be fetched")
+            return {'repo': f"{owner}/{repo}", 'issues': None}
+        finally:
+            for writer in exports:
+                writer.close()
+        # The index links the HTML report, or the first export without one
+        gh.stats.update(report=os.path.basename(exports[0].path),
+                        render_seconds=exports[0].seconds if "html" in report_formats else 0.0)
+        return gh.stats
+
+    start_time = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.parallel_repos) as executor:
+        stats = list(executor.map(lambda owner_repo: fetch_repo(*owner_repo), repos))
+    elapsed = time.monotonic() - start_time
+
+    create_index_page(stats, os.path.join(args.output_dir, "index.html"), log, elapsed)
+    for stat in stats:
+        if stat['issues'] is not None:
+            log.info(f"{stat['repo']}: {stat['issues']} issues, {stat['requests']} requests, "
+                     f"fetch {stat['fetch_seconds']:.1f}s, report {stat['render_seconds']:.1f}s")
+    log.info(f"{len(repos)} repositories done in {elapsed:.1f}s, "
+             f"index written to {os.path.join(args.output_dir, 'index.html')}")
 
 
 if __name__ == "__main__":
     args = parser.parse_args()
     if args.verbose:
         log.setLevel(logging.DEBUG)
-        log_format = "%(levelname)s: %(message)s"
+        log_format = "%(asctime)s %(threadName)s %(levelname)s: %(message)s"
     else:
         log.setLevel(logging.INFO)
         log_format = "%(message)s"
@@ -225,37 +1619,17 @@ if __name__ == "__main__":
     log.debug("Called with: %s" % args)
 
     signal.signal(signal.SIGINT, signal_handler)
+    profiler = None
+    if args.profile:
+        # cProfile only sees the main thread, the worker threads show up as the waits for them
+        profiler = cProfile.Profile()
+        profiler.enable()
+    atexit.register(finish_run, args, profiler)
 
-    if args.github_repo:
-        # Handle both full GitHub URLs and user/repo format
-        repo_input = args.github_repo.strip()
-
-        if repo_input.startswith('https://github.com/') or repo_input.startswith('http://github.com/'):
-            # Extract owner/repo from full URL
-            # Remove the protocol and domain
-            path_part = repo_input.split('github.com/')[-1]
-            # Remove any trailing slashes or .git extension
-            path_part = path_part.rstrip('/').rstrip('.git')
-
-            if "/" in path_part:
-                owner, repo = path_part.split("/", 1)  # Split only on first '/'
-            else:
-                log.error("Invalid GitHub URL format. Expected: https://github.com/user/repo")
-                sys.exit(1)
-        elif "/" in repo_input:
-            # Handle user/repo format
-            parts = repo_input.split("/")
-            if len(parts) == 2:
-                owner, repo = parts
-            else:
-                log.error("Invalid GitHub repo format. Expected: user/repo or https://github.com/user/repo")
-                sys.exit(1)
-        else:
-            log.error("Invalid GitHub repo format. Expected: user/repo or https://github.com/user/repo")
-            sys.exit(1)
-
-        log.debug("GitHub repo: %s/%s" % (owner, repo))
-    else:
+    repos = []
+    for repo_arg in args.github_repo or []:
+        repos += [parse_repo(repo_input) for repo_input in repo_arg.split(",") if repo_input.strip()]
+    if not repos and not args.org:
         log.error("Missing GitHub repo argument")
         sys.exit(1)
 
@@ -265,8 +1639,54 @@ if __name__ == "__main__":
         log.error("Missing GitHub API key argument")
         sys.exit(1)
 
-    gh = GithubWorker(owner, repo, token, log)
-    gh.get_issues()
-    create_html_report(report_data, log)
+    if not 1 <= args.page_size <= 100 or not 1 <= args.first_comments <= 100:
+        log.error("--page-size and --first-comments must be between 1 and 100")
+        sys.exit(1)
+    if not 1 <= args.workers <= 20:
+        log.error("--workers must be between 1 and 20")
+        sys.exit(1)
+    if not 1 <= args.parallel_repos <= 10:
+        log.error("--parallel-repos must be between 1 and 10")
+        sys.exit(1)
+    if args.shard_size is not None and args.shard_size < 1:
+        log.error("--shard-size must be at least 1")
+        sys.exit(1)
+    if args.max_comments is not None and args.max_comments < 0:
+        log.error("--max-comments can not be negative")
+        sys.exit(1)
+    if args.minimal_fields and (args.fetch_mode != "graphql" or args.shard_by):
+        # The REST API always returns whole issues, and the shards need the labels and milestones
+        log.error("--minimal-fields needs --fetch-mode graphql and can not be used with --shard-by")
+        sys.exit(1)
+    filters = filters_from_args(args)
+    report_options.update(shard_size=args.shard_size, shard_by=args.shard_by)
+    report_formats = [name.strip() for name in args.format.split(",") if name.strip()]
+    unknown = set(report_formats) - {"html", "jsonl", "parquet"}
+    if unknown or not report_formats:
+        log.error(f"Unknown --format {', '.join(sorted(unknown))}, expected html, jsonl or parquet")
+        sys.exit(1)
+    if "parquet" in report_formats and importlib.util.find_spec("pyarrow") is None:
+        log.error("--format parquet needs pyarrow: uv pip install pyarrow")
+        sys.exit(1)
 
+    api, client = connect(token, log, args.workers * args.parallel_repos, args.api_url)
+    if args.org:
+        repos += [owner_repo for owner_repo in org_repos(api, args.org, log) if owner_repo not in repos]
 
+    batch_run = len(repos) > 1 or bool(args.org)
+    if batch_run:
+        run_batch(repos, api, client, args, log)
+    else:
+        owner, repo = repos[0]
+        report_path = os.path.join(args.output_dir, "github_report.html")
+        cache = IssueCache(args.cache, cache_key(owner, repo, args.fetch_mode, filters, args.minimal_fields), log) if args.cache else None
+        checkpoint = FetchCheckpoint(args.checkpoint, log)
+        os.makedirs(args.output_dir, exist_ok=True)
+        exports = open_exports(report_path, report_formats, log, **report_options)
+        gh = GithubWorker(owner, repo, api, client, log, args.fetch_mode, args.page_size, args.first_comments, cache,
+                          args.workers, checkpoint, filters=filters, minimal_fields=args.minimal_fields,
+                          exports=exports)
+        workers.append(gh)
+        gh.get_issues(args.resume)
+        for writer in exports:
+            writer.close()
@@ -0,0 +1,146 @@
+"""Benchmark of the wiki page extraction used by create_locations.py, on saved pages.
+
+Runs what the import does with every page (parse, infobox, the description and the
+additional information sections, link rewriting of both texts) once with the previous
+implementation and once with wiki_page.parse_page(), checks that both give the same
+sections, and times them. The pages are the .html files of the given files or
+directories, by default the wiki cache that create_locations.py and
+get_locations_list.py fill.
+
+Usage:
+    python3 benchmarks/bench_wiki_parse.py [PAGES...] [-r REPEAT] [--parser lxml|html.parser]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import wiki_page  # noqa: E402
+
+DESCRIPTION_SECTIONS = ["Background", "Description"]
+POI_SECTIONS = ["Points_of_interest", "Characters", "Companion_reactions", "History", "Districts"]
+
+
+# The implementation WikiPage replaced, kept here as the reference
+def legacy_update_links(html_content, base_url=wiki_page.BASE_URL):
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for a_tag in soup.find_all('a', href=True):
+        href = a_tag['href']
+        if href.startswith("/"):
+            a_tag['href'] = base_url + href
+    return str(soup)
+
+
+def legacy_extract_infobox(soup):
+    image_url = None
+    location_type = None
+    type_section = soup.find("div", {"data-source": "type"})
+    if type_section:
+        type_value = type_section.find("div", class_="pi-data-value pi-font")
+        if type_value:
+            location_type = type_value.text.strip()
+    for section in soup.find_all("section", class_="pi-item pi-group pi-border-color"):
+        h2_tag = section.find("h2")
+        if h2_tag and "Loading screen" in h2_tag.text:
+            figure = section.find("figure", class_="pi-item pi-image")
+            if figure and figure.a and 'href' in figure.a.attrs:
+                image_url = figure.a['href'].split("/revision")[0]
+                break
+    return image_url, location_type
+
+
+def legacy_extract_sections(soup, section_ids):
+    all_content = ""
+    for section_id in section_ids:
+        section_heading = soup.find('span', id=section_id)
+        if section_heading:
+            section_heading = section_heading.parent
+            if section_id != "Background":
+                all_content += f"<h3>{section_id.replace('_', ' ').title()}</h3>"
+            html_content = ""
+            content_sibling = section_heading.find_next_sibling()
+            while content_sibling and (content_sibling.name != "h2"):
+                html_content += str(content_sibling)
+                content_sibling = content_sibling.find_next_sibling()
+            all_content += html_content if html_content else f"{section_id} section not found.\n"
+    return all_content
+
+
+def legacy(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    infobox = legacy_extract_infobox(soup)
+    description = legacy_update_links(legacy_extract_sections(soup, DESCRIPTION_SECTIONS))
+    poi = legacy_update_links(legacy_extract_sections(soup, POI_SECTIONS))
+    return infobox, description, poi
+
+
+def current(content):
+    page = wiki_page.parse_page(content)
+    infobox = page.extract_infobox()
+    description = wiki_page.update_links(page.extract_sections(DESCRIPTION_SECTIONS))
+    poi = wiki_page.update_links(page.extract_sections(POI_SECTIONS))
+    return infobox, description, poi
+
+
+def normalized(result):
+    # The parsers serialize some markup differently (<br/>, entities), compare the trees
+    infobox, description, poi = result
+    return infobox, str(BeautifulSoup(description, 'html.parser')), str(BeautifulSoup(poi, 'html.parser'))
+
+
+def page_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".html"))
+        elif os.path.exists(path):
+            yield path
+
+
+def best_time(function, pages, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in pages:
+            function(content)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("pages", nargs="*", default=[".wiki-cache"],
+                        help="Saved .html pages or directories of them (default: .wiki-cache)")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Timed runs, the best one counts (default: 5)")
+    parser.add_argument("--parser", choices=["lxml", "html.parser"], default=wiki_page.HTML_PARSER,
+                        help=f"Parser of the new implementation (default: {wiki_page.HTML_PARSER})")
+    args = parser.parse_args()
+    wiki_page.HTML_PARSER = args.parser
+
+    pages = []
+    for path in page_files(args.pages):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    if not pages:
+        sys.exit(f"No .html pages in {', '.join(args.pages)}")
+
+    mismatches = sum(normalized(legacy(content)) != normalized(current(content)) for content in pages)
+    size = sum(len(content) for content in pages) / 1024 / 1024
+    print(f"{len(pages)} pages, {size:.1f} MB, parser {args.parser}, "
+          f"{len(pages) - mismatches} same results as the previous implementation")
+    if mismatches:
+        print(f"WARNING: {mismatches} pages give different sections")
+
+    legacy_seconds = best_time(legacy, pages, args.repeat)
+    current_seconds = best_time(current, pages, args.repeat)
+    print(f"{'implementation':<16} {'total s':>8} {'ms/page':>8}")
+    print(f"{'previous':<16} {legacy_seconds:>8.2f} {legacy_seconds / len(pages) * 1000:>8.1f}")
+    print(f"{'parse_page':<16} {current_seconds:>8.2f} {current_seconds / len(pages) * 1000:>8.1f}")
+    print(f"Speedup: {legacy_seconds / current_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,122 +1,67 @@
-import requests
-import time
-from bs4 import BeautifulSoup
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import unquote
 import yaml
-from google.cloud import translate_v2 as translate
-
-# Initialize the Google Cloud Translate client
-translate_client = translate.Client()
+from kanka_client import client_from_config
+from ledger import ImportLedger
+from name_index import NameIndex, add_name_arguments
+from translation import add_translation_arguments, translator_from_args
+from wiki_cache import OfflineMiss, WikiCache, add_cache_arguments, cache_from_args
+from wiki_page import parse_page
+
+# Set up from the command line in main, see kanka_client.py, translation.py and ledger.py
+kanka = None
+translator = None
+ledger = None
 
 # Load configuration from YAML
 with open("config.yaml", 'r') as stream:
     config = yaml.safe_load(stream)
 
-# Load translations
-character_translations = {}
-location_translations = {}
-
-with open("characters.txt", 'r', encoding='utf-8') as file:
-    for line in file:
-        english, translated = line.strip().split(' - ')
-        character_translations[english] = translated
-
-with open("maps.txt", 'r', encoding='utf-8') as file:
-    for line in file:
-        english, translated = line.strip().split(' - ')
-        location_translations[english] = translated
+# Load translations, see name_index.py
+character_translations = NameIndex.load("characters.txt")
+location_translations = NameIndex.load("maps.txt")
 
 KANKA_ENDPOINT = config['kanka']['endpoint']
-KANKA_TOKEN = config['kanka']['token']
 TARGET_LANGUAGE = 'ru'
 
-# Rate limiting variables
-request_counter = 0
-last_request_time = time.time()
-
-def check_rate_limit():
-    global request_counter, last_request_time
-    current_time = time.time()
-    if current_time - last_request_time >= 60:
-        request_counter = 0
-        last_request_time = current_time
-    request_counter += 1
-    if request_counter > 85:
-        sleep_time = 60 - (current_time - last_request_time)
-        print(f"Rate limit reached. Sleeping for {sleep_time} seconds.")
-        if sleep_time > 0:
-            time.sleep(sleep_time)
-        request_counter = 0
-        last_request_time = time.time()
-
-def update_links(html_content, base_url="https://pillarsofeternity.fandom.com"):
-    """
-    Update all relative links in the html_content to absolute links.
-    """
-    soup = BeautifulSoup(html_content, 'html.parser')
-    for a_tag in soup.find_all('a', href=True):  # Find all anchor tags with href attribute
-        href = a_tag['href']
-        if href.startswith("/"):  # Check if the link is relative
-            a_tag['href'] = base_url + href  # Update with the base_url
-    return str(soup)
+FANDOM_LINK = "Fandom Link"
+ADDITIONAL_INFORMATION = "Additional Information"
+DESCRIPTION_SECTIONS = ["Background", "Description"]
+POI_SECTIONS = ["Points_of_interest", "Characters", "Companion_reactions", "History", "Districts"]
+# Posts written into the entity entry instead of sent as posts of their own, one request less each
+FOLDABLE_POSTS = {'fandom_link': FANDOM_LINK, 'additional_information': ADDITIONAL_INFORMATION}
+fold_post_keys = config['kanka'].get('fold_posts') or []
+if not isinstance(fold_post_keys, list):
+    print(f"config.yaml: fold_posts must be a list, e.g. [{', '.join(FOLDABLE_POSTS)}], not {fold_post_keys!r}")
+    raise SystemExit(1)
+unknown_posts = [key for key in fold_post_keys if not isinstance(key, str) or key not in FOLDABLE_POSTS]
+if unknown_posts:
+    print(f"config.yaml: unknown fold_posts {', '.join(map(str, unknown_posts))}, "
+          f"the posts that can be folded are {', '.join(FOLDABLE_POSTS)}")
+    raise SystemExit(1)
+FOLDED_POSTS = {FOLDABLE_POSTS[key] for key in fold_post_keys}
 
 def translate_and_update_description(description):
     """
-    Translate the description and update the links within it.
+    Translate the description, only its text is sent so the links and the markup stay intact.
     """
-    translated_description = translate_text(description)
-    # Update links in the translated description
-    translated_description = update_links(translated_description)
+    return translator.translate_html(description, TARGET_LANGUAGE)
 
-    return translated_description
+# Wiki pages go through the on-disk cache, replaced with the command line settings in main
+wiki_cache = WikiCache()
 
-# Function to translate text
-def translate_text(text, target=TARGET_LANGUAGE):
-    try:
-        result = translate_client.translate(text, target_language=target)
-        return result['translatedText']
-    except Exception as e:
-        print(f"Error in translation: {e}")
-        return text
+# Download and parse a wiki page once, see wiki_page.py for what is extracted from it
+def fetch_wiki_page(url):
+    return parse_page(wiki_cache.get(url))
 
 # Function to fetch and parse wiki for specified sections
 def fetch_and_parse_wiki(url, section_ids):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, 'html.parser')
-    all_content = ""
-    image_url = None  # Initialize variable to hold the image URL
-    location_type = None
-
-    # Find the type of location
-    type_section = soup.find("div", {"data-source": "type"})
-    if type_section:
-        type_value = type_section.find("div", class_="pi-data-value pi-font")
-        if type_value:
-            location_type = type_value.text.strip()
-
-    sections = soup.find_all("section", class_="pi-item pi-group pi-border-color")
-    for section in sections:
-        h2_tag = section.find("h2")
-        if h2_tag and "Loading screen" in h2_tag.text:
-            figure = section.find("figure", class_="pi-item pi-image")
-            if figure and figure.a and 'href' in figure.a.attrs:
-                image_url = figure.a['href'].split("/revision")[0]  # Clean up the URL
-                break  # Break after finding the first matching image
-
-    for section_id in section_ids:
-        section_heading = soup.find('span', id=section_id)
-        if section_heading:
-            section_heading = section_heading.parent
-            if section_id != "Background":
-                all_content += f"<h3>{section_id.replace('_', ' ').title()}</h3>"
-            html_content = ""
-            content_sibling = section_heading.find_next_sibling()
-            while content_sibling and (content_sibling.name != "h2"):
-                html_content += str(content_sibling)
-                content_sibling = content_sibling.find_next_sibling()
-            all_content += html_content if html_content else f"{section_id} section not found.\n"
-
-    return all_content, image_url, location_type  # Return content, image URL, and location type
+    page = fetch_wiki_page(url)
+    image_url, location_type = page.extract_infobox()
+    return page.extract_sections(section_ids), image_url, location_type  # Return content, image URL, and location type
 
 
 # Helper function to extract location name from URL
@@ -124,20 +69,32 @@ def extract_name_from_url(url):
     name = url.split('/')[-1]  
     return unquote(name).replace('_', ' ')
 
-def post_to_kanka_entity(entity_id, fandom_url):
-    check_rate_limit()  # Checking the rate limit
+def separate_posts(post_names):
+    """
+    The posts of an entity that still need a request of their own.
+    """
+    return [name for name in post_names if name not in FOLDED_POSTS]
 
+def fold_posts(entry, url, poi_content=None):
+    """
+    Append the configured fold_posts to the translated entry.
+    """
+    if ADDITIONAL_INFORMATION in FOLDED_POSTS and poi_content:
+        entry += f"<h2>{ADDITIONAL_INFORMATION}</h2>" + translate_and_update_description(poi_content)
+    if FANDOM_LINK in FOLDED_POSTS and url:
+        entry += f"<p><a href='{url}'>{url}</a></p>"
+    return entry
+
+def post_to_kanka_entity(entity_id, fandom_url):
     # Prepare the post data
-    post_title = "Fandom Link"
+    post_title = FANDOM_LINK
+    if post_title in FOLDED_POSTS:
+        return {}
+    if ledger.has_post(entity_id, post_title):
+        ledger.skip()
+        return {}
     post_entry = f"<a href='{fandom_url}'>{fandom_url}</a>"
 
-    # API endpoint and headers
-    post_endpoint = f"https://api.kanka.io/1.0/campaigns/227289/entities/{entity_id}/posts"
-    headers = {
-        'Authorization': f'Bearer {KANKA_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-
     # Data for the POST request
     data = {
         "name": post_title,
@@ -145,36 +102,32 @@ def post_to_kanka_entity(entity_id, fandom_url):
         "entry": post_entry
     }
 
-    response = requests.post(post_endpoint, json=data, headers=headers)
-    return response.json()  # Return the response data
+    response_data = kanka.post(f"entities/{entity_id}/posts", data)
+    ledger.record_post(entity_id, post_title, response_data.get('data', {}).get('id'))
+    return response_data  # Return the response data
 
 # Function to post to a location in Kanka
 def post_to_kanka_location(location_id, poi_content):
-    check_rate_limit()
+    if ADDITIONAL_INFORMATION in FOLDED_POSTS:
+        return None
+    if ledger.has_post(location_id, ADDITIONAL_INFORMATION):
+        ledger.skip()
+        return None
     translated_poi_content = translate_and_update_description(poi_content)
 
-    post_endpoint = f"https://api.kanka.io/1.0/campaigns/227289/entities/{location_id}/posts"
-    headers = {
-        'Authorization': f'Bearer {KANKA_TOKEN}',
-        'Content-Type': 'application/json'
-    }
     data = {
-        "name": "Additional Information",
+        "name": ADDITIONAL_INFORMATION,
         "entity_id": location_id,
         "entry": translated_poi_content
     }
-    response = requests.post(post_endpoint, json=data, headers=headers)
-    return response
+    response_data = kanka.post(f"entities/{location_id}/posts", data)
+    ledger.record_post(location_id, ADDITIONAL_INFORMATION, response_data.get('data', {}).get('id'))
+    return response_data
 
-def create_kanka_location(name, description, image_url=None, location_type=None, parent_id=None, location_url=None):
-    check_rate_limit()
-    translated_description = translate_and_update_description(description)
+def create_kanka_location(name, description, image_url=None, location_type=None, parent_id=None, location_url=None,
+                          poi_content=None):
+    translated_description = fold_posts(translate_and_update_description(description), location_url, poi_content)
 
-    location_endpoint = f"{KANKA_ENDPOINT}/locations"
-    headers = {
-        'Authorization': f'Bearer {KANKA_TOKEN}',
-        'Content-Type': 'application/json'
-    }
     data = {
         "name": name,
         "entry": translated_description
@@ -186,10 +139,10 @@ def create_kanka_location(name, description, image_url=None, location_type=None,
     if location_type:
         data["type"] = location_type
 
-    response = requests.post(location_endpoint, json=data, headers=headers)
-    response_data = response.json()  # Convert response to JSON format
+    response_data = kanka.post("locations", data)
     if response_data.get('data') and response_data['data'].get('entity_id'):
         location_entity_id = response_data['data']['entity_id']
+        ledger.record_entity(location_url, 'location', response_data['data']['id'], location_entity_id)
         post_to_kanka_entity(location_entity_id, location_url)
     return response_data
 
@@ -197,35 +150,57 @@ def create_kanka_character(name, description, location_id, character_url=None):
     """
     Create a character in Kanka with the given information.
     """
-    check_rate_limit()
-    translated_description = translate_and_update_description(description)
+    translated_description = fold_posts(translate_and_update_description(description), character_url)
 
-    character_endpoint = f"{KANKA_ENDPOINT}/characters"
-    headers = {
-        'Authorization': f'Bearer {KANKA_TOKEN}',
-        'Content-Type': 'application/json'
-    }
     data = {
         "name": name,
         "entry": translated_description,
         "location_id": location_id
     }
 
-    response = requests.post(character_endpoint, json=data, headers=headers)
-    response_data = response.json()  # Convert response to JSON format
+    response_data = kanka.post("characters", data)
     if response_data.get('data') and response_data['data'].get('entity_id'):
         entity_id = response_data["data"]["entity_id"]
+        ledger.record_entity(character_url, 'character', response_data['data']['id'], entity_id)
         post_to_kanka_entity(entity_id, character_url)
     return response_data
 
+def missing_posts(done, post_names):
+    """
+    The posts of post_names an earlier run has not created, all of them for a new entity.
+    """
+    return [name for name in separate_posts(post_names) if not done or not ledger.has_post(done['entity_id'], name)]
+
+def resume_entity(url, kind, done, post_names):
+    """
+    Finish an entity created by an earlier run: only its missing posts are sent.
+
+    The entry is not translated again, and the page is only fetched when the additional
+    information post still needs its translated text.
+    """
+    missing = missing_posts(done, post_names)
+    # The entity itself and the posts that exist
+    ledger.skip(1 + len(separate_posts(post_names)) - len(missing))
+    if not missing:
+        print(f"{kind.capitalize()} {url} already imported, skipping")
+        return
+    if FANDOM_LINK in missing:
+        post_to_kanka_entity(done['entity_id'], url)
+    if ADDITIONAL_INFORMATION in missing:
+        post_to_kanka_location(done['entity_id'], fetch_wiki_page(url).extract_sections(POI_SECTIONS))
+    print(f"{kind.capitalize()} {url} already imported, sent its missing posts: {', '.join(missing)}")
+
 def process_character(character_url, location_id):
     """
     Process each character: fetch data, create entity in Kanka.
     """
+    done = ledger.entity(character_url)
+    if done:
+        resume_entity(character_url, 'character', done, [FANDOM_LINK])
+        return
     character_name = extract_name_from_url(character_url)
-    if character_name in character_translations:
-        character_name = character_translations[character_name]
-    character_description, _, _ = fetch_and_parse_wiki(character_url, ["Background", "Description"])  # Assuming these sections are relevant
+    character_name = character_translations.translate(character_name)
+    character_description, _, _ = fetch_and_parse_wiki(character_url, DESCRIPTION_SECTIONS)  # Assuming these sections are relevant
 
     character_response = create_kanka_character(character_name, character_description, location_id, character_url)
 
@@ -237,32 +212,163 @@ def process_character(character_url, location_id):
 
 # Modify process_location to handle characters
 def process_location(location, parent_id=None):
+    done = ledger.entity(location['url'])
+    if done:
+        # The description is not translated again, go on to what is below it
+        resume_entity(location['url'], 'location', done, [FANDOM_LINK, ADDITIONAL_INFORMATION])
+        queue_contents(location, done['id'])
+        return
     location_name = extract_name_from_url(location['url'])
-    if location_name in location_translations:
-        location_name = location_translations[location_name]
-    location_description, image_url, location_type = fetch_and_parse_wiki(location['url'], ["Background", "Description"])
-    poi_description = fetch_and_parse_wiki(location['url'], ["Points_of_interest", "Characters", "Companion_reactions", "History", "Districts"])[0]
-
-    location_response = create_kanka_location(location_name, location_description, image_url, location_type, parent_id, location['url'])
+    location_name = location_translations.translate(location_name)
+    # One download and parse of the page serves both the description and the additional information post
+    page = fetch_wiki_page(location['url'])
+    image_url, location_type = page.extract_infobox()
+    location_description = page.extract_sections(DESCRIPTION_SECTIONS)
+    poi_description = page.extract_sections(POI_SECTIONS)
+    # The text of both goes to the translation service in one call, the create/post calls below then find it cached
+    translator.translate_html_many([location_description, poi_description], TARGET_LANGUAGE)
+
+    location_response = create_kanka_location(location_name, location_description, image_url, location_type, parent_id,
+                                              location['url'], poi_description)
 
     if location_response.get('data') and location_response.get('data').get('entity_id'):
         location_id = location_response["data"]["id"]
         entity_id = location_response["data"]["entity_id"]
         post_response = post_to_kanka_location(entity_id, poi_description)
-        print(f"Posted to {location_name}: Status {post_response.status_code}")
-
-        # Process characters associated with this location
-        for character in location.get('characters', []):
-            process_character(character['url'], location_id)
-
-        # Process child locations
-        for child_location in location.get('children', []):
-            process_location(child_location, parent_id=location_id)
+        if post_response is not None:
+            print(f"Posted to {location_name}: post ID {post_response.get('data', {}).get('id')}")
+        queue_contents(location, location_id)
     else:
         print(f"Failed to create {location_name}: Status {location_response.get('errors')}")
 
+def queue_contents(location, location_id):
+    # The location exists now, so its characters and children can all go in parallel
+    for character in location.get('characters', []):
+        submit(process_character, character['url'], location_id)
+
+    for child_location in location.get('children', []):
+        submit(process_location, child_location, location_id)
+
+
+def plan_import(locations):
+    """
+    Walk the tree like the import does and count what it would cost, without calling Kanka.
+
+    Pages come from the wiki cache (downloaded into it when missing, unless --offline),
+    the ledger tells what earlier runs already created.
+    """
+    plan = {'requests': Counter(), 'texts': [], 'locations': 0, 'characters': 0, 'done': 0, 'folded': 0,
+            'missing_pages': []}
+    posts_endpoint = f"{KANKA_ENDPOINT}/entities/{{entity_id}}/posts"
+
+    def plan_entity(url, kind, post_names):
+        # The requests process_location/process_character would still send for this page
+        plan[kind + 's'] += 1
+        done = ledger.entity(url)
+        if not done:
+            plan['requests'][f"{KANKA_ENDPOINT}/{kind}s"] += 1
+            # Each one would have been a post of its own without fold_posts
+            plan['folded'] += len(post_names) - len(separate_posts(post_names))
+        missing = missing_posts(done, post_names)
+        if missing:
+            plan['requests'][posts_endpoint] += len(missing)
+        if done and not missing:
+            plan['done'] += 1
+        # The sections the import would translate, see process_location and resume_entity
+        if not done:
+            sections = [DESCRIPTION_SECTIONS, POI_SECTIONS] if kind == 'location' else [DESCRIPTION_SECTIONS]
+        else:
+            sections = [POI_SECTIONS] if ADDITIONAL_INFORMATION in missing else []
+        if not sections:
+            return
+        try:
+            page = fetch_wiki_page(url)
+        except OfflineMiss:
+            plan['missing_pages'].append(url)
+            return
+        plan['texts'] += [page.extract_sections(section_ids) for section_ids in sections]
+
+    stack = list(reversed(locations))
+    while stack:
+        location = stack.pop()
+        plan_entity(location['url'], 'location', [FANDOM_LINK, ADDITIONAL_INFORMATION])
+        for character in location.get('characters', []):
+            plan_entity(character['url'], 'character', [FANDOM_LINK])
+        stack.extend(reversed(location.get('children', [])))
+    return plan
+
+def print_plan(plan):
+    total = sum(plan['requests'].values())
+    texts = translator.uncached_html(plan['texts'], TARGET_LANGUAGE)
+    print(f"Import plan for {plan['locations']} locations and {plan['characters']} characters "
+          f"({plan['done']} already imported):")
+    for endpoint, count in sorted(plan['requests'].items()):
+        print(f"  POST {endpoint}: {count}")
+    print(f"  Total: {total} Kanka requests" + (f", {total + plan['folded']} without fold_posts" if plan['folded'] else ""))
+    print(f"Translation: {len(texts)} texts, {sum(len(text) for text in texts)} characters not in the translation cache")
+    print(wiki_cache.summary())
+    if plan['missing_pages']:
+        print(f"{len(plan['missing_pages'])} pages are not in the wiki cache, their requests are counted "
+              f"but not their translations:")
+        for url in plan['missing_pages']:
+            print(f"  {url}")
+    seconds = kanka.bucket.seconds_for(total)
+    print(f"Expected time: {seconds:.0f} seconds ({seconds / 60:.1f} minutes) at {config['kanka'].get('rate_limit', 90)} requests per minute")
+
+
+# Import tasks still running, see submit()
+executor = None
+pending = []
+pending_lock = threading.Lock()
+
+def submit(task, *args):
+    with pending_lock:
+        pending.append(executor.submit(task, *args))
+
+def wait_for_import():
+    """Wait until no task is left, tasks keep adding their children while we wait."""
+    while True:
+        with pending_lock:
+            if not pending:
+                return
+            future = pending.pop(0)
+        try:
+            future.result()
+        except Exception as e:
+            # One broken page should not stop the rest of the tree
+            print(f"Import task failed: {e}")
+
 
 # Main execution
 if __name__ == "__main__":
-    for location in config['locations']:
-        process_location(location)
+    parser = argparse.ArgumentParser(description="Import the locations and characters of config.yaml into Kanka")
+    parser.add_argument("-w", "--workers", type=int, default=4,
+                        help="Locations and characters imported in parallel (default: 4)")
+    add_cache_arguments(parser)
+    add_translation_arguments(parser)
+    add_name_arguments(parser)
+    parser.add_argument("--ledger", default=".kanka-ledger.sqlite",
+                        help="SQLite record of the created entities and posts, reruns skip them (default: .kanka-ledger.sqlite)")
+    parser.add_argument("--plan", action="store_true",
+                        help="Only print the Kanka requests, translation characters and time the import would take")
+    args = parser.parse_args()
+    kanka = client_from_config(config, pool_size=args.workers)
+    wiki_cache = cache_from_args(args, pool_size=args.workers)
+    translator = translator_from_args(args)
+    ledger = ImportLedger(args.ledger, KANKA_ENDPOINT)
+    character_translations.cutoff = location_translations.cutoff = args.fuzzy_names
+
+    if args.plan:
+        print_plan(plan_import(config['locations']))
+        raise SystemExit
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for location in config['locations']:
+            submit(process_location, location)
+        wait_for_import()
+    print(kanka.summary())
+    print(wiki_cache.summary())
+    print(translator.summary())
+    print(ledger.summary())
+    print(location_translations.summary("Location names"))
+    print(character_translations.summary("Character names"))
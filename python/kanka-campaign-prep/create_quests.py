@@ -1,56 +1,27 @@
-import requests
-import time
-from bs4 import BeautifulSoup
 from urllib.parse import unquote
 import yaml
-from google.cloud import translate_v2 as translate
+from kanka_client import client_from_config
+from translation import GoogleBackend, Translator
+from wiki_page import update_links
 
-# Initialize the Google Cloud Translate client
-translate_client = translate.Client()
+# Cached Google Cloud Translate client, see translation.py
+translator = Translator(GoogleBackend())
 
 # Load configuration from YAML
 with open("config.yaml", 'r') as stream:
     config = yaml.safe_load(stream)
 
 KANKA_ENDPOINT = config['kanka']['endpoint']
-KANKA_TOKEN = config['kanka']['token']
 TARGET_LANGUAGE = 'ru'
 
-# Rate limiting variables
-request_counter = 0
-last_request_time = time.time()
-
-def check_rate_limit():
-    global request_counter, last_request_time
-    current_time = time.time()
-    if current_time - last_request_time >= 60:
-        request_counter = 0
-        last_request_time = current_time
-    request_counter += 1
-    if request_counter > 85:
-        sleep_time = 60 - (current_time - last_request_time)
-        print(f"Rate limit reached. Sleeping for {sleep_time} seconds.")
-        if sleep_time > 0:
-            time.sleep(sleep_time)
-        request_counter = 0
-        last_request_time = time.time()
-
-def update_links(html_content, base_url="https://pillarsofeternity.fandom.com"):
-    """
-    Update all relative links in the html_content to absolute links.
-    """
-    soup = BeautifulSoup(html_content, 'html.parser')
-    for a_tag in soup.find_all('a', href=True):  # Find all anchor tags with href attribute
-        href = a_tag['href']
-        if href.startswith("/"):  # Check if the link is relative
-            a_tag['href'] = base_url + href  # Update with the base_url
-    return str(soup)
+# Pooled session, rate limit and retries shared with create_locations.py, see kanka_client.py
+kanka = client_from_config(config)
 
 def translate_and_update_description(description):
     """
     Translate the description and update the links within it.
     """
-    translated_description = translate_text(description)
+    translated_description = translator.translate_html(description, TARGET_LANGUAGE)
     # Update links in the translated description
     translated_description = update_links(translated_description)
 
@@ -58,28 +29,14 @@ def translate_and_update_description(description):
 
 # Function to translate text
 def translate_text(text, target=TARGET_LANGUAGE):
-    try:
-        result = translate_client.translate(text, target_language=target)
-        return result['translatedText']
-    except Exception as e:
-        print(f"Error in translation: {e}")
-        return text
+    return translator.translate(text, target)
 
 
 def post_to_kanka_entity(entity_id, fandom_url):
-    check_rate_limit()  # Checking the rate limit
-
     # Prepare the post data
     post_title = "Fandom Link"
     post_entry = f"<a href='{fandom_url}'>{fandom_url}</a>"
 
-    # API endpoint and headers
-    post_endpoint = f"https://api.kanka.io/1.0/campaigns/227289/entities/{entity_id}/posts"
-    headers = {
-        'Authorization': f'Bearer {KANKA_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-
     # Data for the POST request
     data = {
         "name": post_title,
@@ -87,5 +44,4 @@ def post_to_kanka_entity(entity_id, fandom_url):
         "entry": post_entry
     }
 
-    response = requests.post(post_endpoint, json=data, headers=headers)
-    return response.json()  # Return the response data
+    return kanka.post(f"entities/{entity_id}/posts", data)  # Return the response data
@@ -1,6 +1,12 @@
+import argparse
+import os
+import sys
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 import yaml
+from wiki_cache import OfflineMiss, WikiCache, add_cache_arguments, cache_from_args
+from wiki_page import HTML_PARSER
 
 BASE_URL = "https://pillarsofeternity.fandom.com"
 
@@ -12,10 +18,12 @@ def quoted_scalar(dumper, data):
 
 yaml.add_representer(QuotedStr, quoted_scalar)
 
+# Replaced with the command line settings in main
+wiki_cache = WikiCache()
+
 def get_parsed_html(url):
-    response = requests.get(url)
-    response.raise_for_status()  # Raises an HTTPError if the HTTP request returned an unsuccessful status code
-    return BeautifulSoup(response.content, 'html.parser')
+    # Raises an HTTPError if the HTTP request returned an unsuccessful status code
+    return BeautifulSoup(wiki_cache.get(url), HTML_PARSER)
 
 def extract_contains_section(soup):
     contains = soup.select_one('div[data-source="sub_locations"]')
@@ -35,33 +43,91 @@ def format_data(url, characters, children):
         'children': [{'url': child} for child in children]
     }
 
-def process_location(url, processed=set()):
-    if url in processed:  # Prevent processing the same URL multiple times
-        return None
-    processed.add(url)
+def fetch_location(url):
     soup = get_parsed_html(url)
-    characters = extract_characters_section(soup)
-    children = extract_contains_section(soup)
-    data = format_data(url, characters, children)
-    child_data_list = []
-    for child in children:
-        child_data = process_location(child, processed)
-        if child_data:  # Append child data if it exists
-            child_data_list.append(child_data)
-    if child_data_list:
-        data['children'] = child_data_list
+    return extract_characters_section(soup), extract_contains_section(soup)
+
+def build_tree(url, pages, owners):
+    """
+    The YAML node of url. A sub-location listed by several pages only goes under the first
+    one that found it, and the ones left out by the limits stay as plain {'url': ...} entries.
+    """
+    if url not in pages:
+        return {'url': QuotedStr(url)}
+    characters, children = pages[url]
+    data = format_data(url, characters, [])
+    data['children'] = [build_tree(child, pages, owners) for child in children if owners.get(child) == url]
     return data
 
+def write_yaml(roots, pages, owners, output):
+    formatted_data = {'locations': [build_tree(url, pages, owners) for url in roots]}
+    yaml_data = yaml.dump(formatted_data, allow_unicode=True, default_flow_style=False, sort_keys=False, indent=2)
+    if output is None:
+        print(yaml_data)
+        return
+    # Rewritten after each level, a stopped crawl still leaves a usable file
+    with open(output + ".tmp", "w", encoding="utf-8") as f:
+        f.write(yaml_data)
+    os.replace(output + ".tmp", output)
+
+def crawl(start_urls, max_depth=None, max_pages=None, workers=4, output=None):
+    """
+    Breadth-first crawl of the sub-locations, one level at a time with the pages of a level
+    fetched in parallel. Results are handled in page order, so the tree does not depend on
+    which download finished first.
+    """
+    pages = {}
+    owners = {url: None for url in start_urls}
+    level = list(owners)
+    depth = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while level:
+            if max_pages is not None:
+                level = level[:max_pages - len(pages)]
+            futures = [(url, executor.submit(fetch_location, url)) for url in level]
+            next_level = []
+            for url, future in futures:
+                try:
+                    pages[url] = future.result()
+                except (requests.RequestException, OfflineMiss) as e:
+                    print(f"Skipping {url}: {e}", file=sys.stderr)
+                    continue
+                except (AttributeError, KeyError, TypeError) as e:
+                    # A page laid out differently than the parser expects is skipped like a failed download
+                    print(f"Skipping {url}, could not parse the page: {e!r}", file=sys.stderr)
+                    continue
+                for child in pages[url][1]:
+                    if child not in owners:
+                        owners[child] = url
+                        next_level.append(child)
+            print(f"Depth {depth}: {len(level)} pages, {len(pages)} crawled in total", file=sys.stderr)
+            if output:
+                write_yaml(start_urls, pages, owners, output)
+            depth += 1
+            if (max_depth is not None and depth > max_depth) or (max_pages is not None and len(pages) >= max_pages):
+                break
+            level = next_level
+    if not output:
+        write_yaml(start_urls, pages, owners, None)
+    return pages
+
 # Start the script with the initial URL
 if __name__ == "__main__":
-    initial_url = BASE_URL + "/wiki/Stormwall_Gorge"
+    parser = argparse.ArgumentParser(description="Crawl wiki locations and their sub-locations into the config.yaml locations tree")
+    parser.add_argument("urls", nargs="*", default=[BASE_URL + "/wiki/Stormwall_Gorge"],
+                        help="Location pages to start from (default: Stormwall Gorge)")
+    parser.add_argument("-d", "--max-depth", type=int, help="Levels of sub-locations to follow (default: all)")
+    parser.add_argument("-n", "--max-pages", type=int, help="Stop after this many pages (default: no limit)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Pages fetched in parallel (default: 4)")
+    parser.add_argument("-o", "--output", help="Write the YAML to this file after every level instead of printing it")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    wiki_cache = cache_from_args(args, pool_size=args.workers)
+
     try:
-        location_data = process_location(initial_url)
-        formatted_data = {'locations': [location_data]}  # Wrap the single location data into a list
-        yaml_data = yaml.dump(formatted_data, allow_unicode=True, default_flow_style=False, sort_keys=False, indent=2)
-        print(yaml_data)
+        crawl(args.urls, args.max_depth, args.max_pages, args.workers, args.output)
+        print(wiki_cache.summary(), file=sys.stderr)
     except requests.RequestException as e:
         print(f"Request failed: {e}")
     except Exception as e:
         print(f"An error occurred: {e}")
-
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import random
+import threading
+import time
+
+import requests
+import urllib3
+
+
+class KankaError(Exception):
+    """
+    A Kanka request that failed for good, after the retries.
+    """
+    def __init__(self, method, url, status, body):
+        super().__init__(f"{method} {url} failed with status {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+class TokenBucket:
+    """Kanka request budget shared by all the import threads.
+
+    Kanka allows `per_minute` requests in any 60 seconds. The bucket starts with `burst`
+    tokens and refills the rest evenly over the minute, so burst + refill never goes over
+    the limit, however the requests are spread between the threads. sync() corrects it with
+    the X-RateLimit-* headers of every response, so requests made elsewhere with the same
+    token (a second script, the web UI) are accounted for too.
+    """
+    def __init__(self, per_minute=90, burst=10):
+        self.per_minute = per_minute
+        self.capacity = burst
+        self.tokens = burst
+        self.rate = (per_minute - burst) / 60
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token and return the seconds to wait before using it.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now, the callers queue up behind each other
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def take(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def sync(self, limit, remaining):
+        """
+        Adjust to the limit and the remaining requests Kanka reports.
+        """
+        with self.lock:
+            if limit and limit > self.capacity and limit != self.per_minute:
+                self.per_minute = limit
+                self.rate = (limit - self.capacity) / 60
+            # Never more than Kanka says is left, the reservations already made stay counted
+            if remaining is not None:
+                self.tokens = min(self.tokens, remaining)
+
+    def seconds_for(self, requests):
+        """
+        Time `requests` calls take from a full bucket.
+        """
+        return max(0, requests - self.capacity) / self.rate
+
+
+def header_int(headers, name):
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def retry_delay(response, attempt):
+    """
+    Seconds to wait before retrying: what Retry-After asks for, else exponential backoff with jitter.
+    """
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return min(60, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def connect_failed(error):
+    """
+    True when the connection could not be opened, so the request never reached Kanka.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+class KankaClient:
+    """
+    The Kanka API of one campaign, shared by the import scripts and their threads.
+
+    All the requests go through one keep-alive session with a connection pool and wait for
+    a token of the shared TokenBucket. 429 and 5xx responses and connection errors are
+    retried up to `retries` times, waiting as long as Retry-After asks or backing off
+    exponentially. Other errors raise KankaError right away.
+
+    A POST creates an entity, sending it again after a 5xx or a dropped connection can create
+    it twice. POSTs are only retried on 429 and when the connection could not be opened, the
+    other failures raise KankaError and the ledger lets a rerun pick the entity up.
+    """
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+    def __init__(self, endpoint, token, rate_limit=90, retries=5, pool_size=10):
+        self.endpoint = endpoint.rstrip("/")
+        self.retries = retries
+        self.bucket = TokenBucket(rate_limit)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+        })
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0}
+
+    def url(self, path):
+        return path if path.startswith("http") else f"{self.endpoint}/{path.lstrip('/')}"
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def handle(self, method, url, response, attempt):
+        """
+        Return the response data, or the seconds to wait before the next attempt.
+        """
+        if response is not None:
+            self.bucket.sync(header_int(response.headers, 'X-RateLimit-Limit'),
+                             header_int(response.headers, 'X-RateLimit-Remaining'))
+            if response.status_code == 429:
+                self.count('throttled')
+            retry = response.status_code == 429 or (response.status_code in self.RETRY_STATUSES
+                                                     and method in self.IDEMPOTENT_METHODS)
+            if not retry:
+                if response.status_code >= 400:
+                    raise KankaError(method, url, response.status_code, response.text[:500])
+                return response.json() if response.content else {}, None
+        if attempt >= self.retries:
+            raise KankaError(method, url, response.status_code if response is not None else None,
+                             response.text[:500] if response is not None else "connection failed")
+        self.count('retries')
+        return None, retry_delay(response, attempt)
+
+    def request(self, method, path, data=None):
+        url = self.url(path)
+        for attempt in range(self.retries + 1):
+            self.bucket.take()
+            self.count('requests')
+            try:
+                response = self.session.request(method, url, json=data, timeout=60)
+            except requests.ConnectionError as e:
+                if method not in self.IDEMPOTENT_METHODS and not connect_failed(e):
+                    # Kanka may have received it already
+                    raise KankaError(method, url, None, f"connection lost: {e}") from e
+                response = None
+            result, wait = self.handle(method, url, response, attempt)
+            if wait is None:
+                return result
+            time.sleep(wait)
+
+    def get(self, path):
+        return self.request("GET", path)
+
+    def post(self, path, data):
+        return self.request("POST", path, data)
+
+    def summary(self):
+        return (f"Kanka: {self.stats['requests']} requests, {self.stats['retries']} retried, "
+                f"{self.stats['throttled']} throttled by Kanka")
+
+
+class AsyncKankaClient(KankaClient):
+    """
+    KankaClient for asyncio code, on aiohttp. Same bucket, retries and errors.
+    """
+    def __init__(self, endpoint, token, rate_limit=90, retries=5, pool_size=10):
+        super().__init__(endpoint, token, rate_limit, retries, pool_size)
+        self.pool_size = pool_size
+        self.async_session = None
+
+    async def open(self):
+        # Imported here so the threaded scripts work without aiohttp
+        import aiohttp
+        self.async_session = aiohttp.ClientSession(headers=dict(self.session.headers),
+                                                   connector=aiohttp.TCPConnector(limit=self.pool_size),
+                                                   timeout=aiohttp.ClientTimeout(total=60))
+        return self
+
+    async def close(self):
+        await self.async_session.close()
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def request(self, method, path, data=None):
+        import aiohttp
+        url = self.url(path)
+        for attempt in range(self.retries + 1):
+            await asyncio.sleep(self.bucket.reserve())
+            self.count('requests')
+            try:
+                async with self.async_session.request(method, url, json=data) as response:
+                    body = await response.read()
+                    # The sync checks only need these attributes, read before the connection is released
+                    response = AsyncResponse(response.status, response.headers, body)
+            except aiohttp.ClientConnectorError:
+                # The connection could not be opened, nothing was sent
+                response = None
+            except aiohttp.ClientConnectionError as e:
+                if method not in self.IDEMPOTENT_METHODS:
+                    raise KankaError(method, url, None, f"connection lost: {e}") from e
+                response = None
+            result, wait = self.handle(method, url, response, attempt)
+            if wait is None:
+                return result
+            await asyncio.sleep(wait)
+
+    async def get(self, path):
+        return await self.request("GET", path)
+
+    async def post(self, path, data):
+        return await self.request("POST", path, data)
+
+
+class AsyncResponse:
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.text = content.decode("utf-8", "replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def client_from_config(config, pool_size=10):
+    """
+    The client for the kanka section of config.yaml.
+    """
+    kanka = config['kanka']
+    return KankaClient(kanka['endpoint'], kanka['token'], kanka.get('rate_limit', 90), pool_size=pool_size)
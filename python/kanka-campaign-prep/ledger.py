@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+
+
+class ImportLedger:
+    """
+    What an import already created in Kanka, so running it again resumes instead of duplicating.
+
+    Entities are keyed by their fandom URL and posts by (entity_id, post name), per campaign
+    endpoint. Every row is written right after the POST that created it succeeded, so a crash
+    or a 429 halfway through a location loses at most the request in flight.
+    """
+    def __init__(self, path, campaign):
+        self.campaign = campaign
+        self.lock = threading.Lock()
+        # Import threads share the connection, every use holds the lock
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS entities ("
+                        "campaign TEXT NOT NULL, url TEXT NOT NULL, kind TEXT NOT NULL, "
+                        "id INTEGER NOT NULL, entity_id INTEGER NOT NULL, PRIMARY KEY (campaign, url))")
+        self.db.execute("CREATE TABLE IF NOT EXISTS posts ("
+                        "campaign TEXT NOT NULL, entity_id INTEGER NOT NULL, name TEXT NOT NULL, post_id INTEGER, "
+                        "PRIMARY KEY (campaign, entity_id, name))")
+        self.db.commit()
+        self.stats = {'skipped': 0, 'recorded': 0}
+
+    def entity(self, url):
+        """
+        Return {'id': ..., 'entity_id': ...} of the entity created for url, or None.
+        """
+        with self.lock:
+            row = self.db.execute("SELECT id, entity_id FROM entities WHERE campaign = ? AND url = ?",
+                                  (self.campaign, url)).fetchone()
+        return {'id': row[0], 'entity_id': row[1]} if row else None
+
+    def record_entity(self, url, kind, id, entity_id):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO entities (campaign, url, kind, id, entity_id) VALUES (?, ?, ?, ?, ?)",
+                            (self.campaign, url, kind, id, entity_id))
+            self.stats['recorded'] += 1
+
+    def has_post(self, entity_id, name):
+        with self.lock:
+            row = self.db.execute("SELECT 1 FROM posts WHERE campaign = ? AND entity_id = ? AND name = ?",
+                                  (self.campaign, entity_id, name)).fetchone()
+        return row is not None
+
+    def skip(self, requests=1):
+        """
+        Count requests not sent because an earlier run did them, the lookups above count nothing.
+        """
+        with self.lock:
+            self.stats['skipped'] += requests
+
+    def record_post(self, entity_id, name, post_id):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO posts (campaign, entity_id, name, post_id) VALUES (?, ?, ?, ?)",
+                            (self.campaign, entity_id, name, post_id))
+            self.stats['recorded'] += 1
+
+    def summary(self):
+        return f"Ledger: {self.stats['skipped']} requests skipped as already done, {self.stats['recorded']} new records"
@@ -0,0 +1,125 @@
+import difflib
+import os
+import pickle
+import threading
+import unicodedata
+
+SEPARATOR = " - "
+
+
+def normalize(name):
+    """
+    The lookup key of a name: no case, accents, underscores or repeated spaces.
+    """
+    name = unicodedata.normalize("NFKD", name.replace("_", " ").replace("’", "'"))
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    return " ".join(name.casefold().split())
+
+
+def parse_names(path):
+    """
+    Read an "English name - translated name" file into {normalized English name: translation}.
+
+    Only the first separator splits the line, a translation like "Кэд Нуа - крепость" stays
+    whole. Blank lines and lines without a separator are reported and skipped.
+    """
+    names = {}
+    with open(path, 'r', encoding='utf-8') as file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            english, separator, translated = line.partition(SEPARATOR)
+            if not separator or not english.strip() or not translated.strip():
+                print(f"{path}:{number}: no '{SEPARATOR.strip()}' between two names, skipped: {line}")
+                continue
+            names[normalize(english)] = translated.strip()
+    return names
+
+
+class NameIndex:
+    """
+    Translations of the location and character names, looked up by the names the wiki URLs give.
+
+    Keys are normalized (see normalize()), so "Dyrford_Village", "dyrford village" and
+    "Dýrford Village" all find the same line. With a `cutoff` the names that still miss
+    get the closest key at least that similar (difflib ratio, 0 to 1), e.g. "Dracogen Inn"
+    for "Dracogen's Inn". Every name that misses is remembered for summary().
+    """
+    def __init__(self, names, cutoff=None):
+        self.names = names
+        self.keys = list(names)
+        self.cutoff = cutoff
+        self.lock = threading.Lock()
+        self.fuzzy = {}
+        self.missing = set()
+        self.stats = {'exact': 0, 'fuzzy': 0, 'missing': 0}
+
+    @classmethod
+    def load(cls, path, cutoff=None):
+        """
+        Load the names file, from its pickled index when the file has not changed since.
+        """
+        cache_path = path + ".names.pickle"
+        source = os.stat(path)
+        try:
+            with open(cache_path, "rb") as f:
+                mtime, size, names = pickle.load(f)
+            if (mtime, size) == (source.st_mtime_ns, source.st_size):
+                return cls(names, cutoff)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            pass
+        names = parse_names(path)
+        try:
+            with open(cache_path + ".tmp", "wb") as f:
+                pickle.dump((source.st_mtime_ns, source.st_size, names), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(cache_path + ".tmp", cache_path)
+        except OSError as e:
+            # A read-only checkout still works, it just parses the file every time
+            print(f"Could not write the name index {cache_path}: {e}")
+        return cls(names, cutoff)
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def closest(self, key):
+        with self.lock:
+            if key in self.fuzzy:
+                return self.fuzzy[key]
+        matches = difflib.get_close_matches(key, self.keys, n=1, cutoff=self.cutoff)
+        match = matches[0] if matches else None
+        with self.lock:
+            self.fuzzy[key] = match
+        return match
+
+    def translate(self, name):
+        """
+        Return the translation of name, or name itself when there is none.
+        """
+        key = normalize(name)
+        if key in self.names:
+            self.count('exact')
+            return self.names[key]
+        match = self.closest(key) if self.cutoff else None
+        if match:
+            self.count('fuzzy')
+            print(f"Name '{name}' has no translation, using the one of its closest match '{match}'")
+            return self.names[match]
+        self.count('missing')
+        with self.lock:
+            self.missing.add(name)
+        return name
+
+    def summary(self, label="Names"):
+        summary = (f"{label}: {self.stats['exact']} translated, {self.stats['fuzzy']} by closest match, "
+                   f"{self.stats['missing']} without translation")
+        if self.missing:
+            summary += "\n  " + "\n  ".join(sorted(self.missing))
+        return summary
+
+
+def add_name_arguments(parser):
+    parser.add_argument("--fuzzy-names", type=float, nargs="?", const=0.85, metavar="CUTOFF",
+                        help="Translate names missing from characters.txt/maps.txt with the closest one at least "
+                             "this similar, 0 to 1 (default when given: 0.85)")
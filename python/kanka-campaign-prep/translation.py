@@ -0,0 +1,303 @@
+import hashlib
+import html
+import re
+import sqlite3
+import threading
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# Text inside these is code, not prose
+UNTRANSLATED_TAGS = {'script', 'style', 'code', 'pre'}
+# Tags that sit inside a sentence, they are translated along with the text around them
+INLINE_TAGS = {'a', 'abbr', 'b', 'bdi', 'big', 'cite', 'del', 'dfn', 'em', 'font', 'i', 'ins', 'kbd', 'mark',
+               'q', 's', 'samp', 'small', 'span', 'strong', 'sub', 'sup', 'time', 'tt', 'u', 'var'}
+PLACEHOLDER_ID = re.compile(r"t(\d+)")
+
+
+class GoogleBackend:
+    """
+    Google Cloud Translate v2, the credentials come from GOOGLE_APPLICATION_CREDENTIALS.
+    """
+    name = "google"
+    # One call takes at most 128 strings, and Google advises against very large requests
+    max_batch = 128
+    max_chars = 30000
+
+    def __init__(self):
+        self.client = None
+
+    def translate(self, texts, target, text_only=False):
+        if self.client is None:
+            # Imported on the first call, so the stub backend and --plan work without the Google libraries
+            from google.cloud import translate_v2 as translate
+            self.client = translate.Client()
+        # Plain text needs no HTML escaping on the way in or out
+        results = self.client.translate(texts, target_language=target, format_="text" if text_only else "html")
+        return [result['translatedText'] for result in results]
+
+
+class StubBackend:
+    """
+    Offline stand-in for tests and benchmarks: tags the text with the language instead of translating it.
+    """
+    name = "stub"
+    max_batch = 128
+    max_chars = 30000
+
+    def translate(self, texts, target, text_only=False):
+        return [f"[{target}] {text}" for text in texts]
+
+
+BACKENDS = {'google': GoogleBackend, 'stub': StubBackend}
+
+
+def is_text(node):
+    # Comments, CDATA and doctypes are NavigableString subclasses
+    return type(node) is NavigableString and node.parent.name not in UNTRANSLATED_TAGS
+
+
+def text_nodes(nodes):
+    """
+    The text nodes under `nodes` worth translating: prose with at least one letter.
+    """
+    found = []
+    for node in nodes:
+        strings = node.find_all(string=True) if isinstance(node, Tag) else [node]
+        found += [string for string in strings if is_text(string) and any(char.isalpha() for char in string)]
+    return found
+
+
+def is_inline(node):
+    if isinstance(node, Tag):
+        return node.name in INLINE_TAGS and all(is_inline(child) for child in node.children)
+    return is_text(node)
+
+
+def translation_units(element):
+    """
+    The runs of inline content of a parsed document, each one a list of sibling nodes.
+
+    A run is the text of a paragraph, list item, cell... with the links and the emphasis in it,
+    so it is translated as a whole and the words can move around the tags. Block elements,
+    line breaks, images and code end a run.
+    """
+    units = []
+    run = []
+    for child in element.children:
+        if is_inline(child):
+            run.append(child)
+            continue
+        if run:
+            units.append(run)
+            run = []
+        if isinstance(child, Tag) and child.name not in UNTRANSLATED_TAGS:
+            units += translation_units(child)
+    if run:
+        units.append(run)
+    return [run for run in units if text_nodes(run)]
+
+
+def encode_unit(nodes, tags):
+    """
+    A run as an HTML string for the backend: the text, and <span id="tN"> in place of the Nth tag.
+
+    Only the tag names are replaced, neither their attributes nor the link URLs are sent. The
+    numbering starts over in every run, so the same sentence with other links is cached once.
+    """
+    parts = []
+    for node in nodes:
+        if isinstance(node, Tag):
+            tags.append(node)
+            parts.append(f'<span id="t{len(tags)}">{encode_unit(node.children, tags)}</span>')
+        else:
+            parts.append(html.escape(str(node), quote=False))
+    return "".join(parts)
+
+
+def decode_unit(translated, tags, used):
+    """
+    The nodes of a translated run, its placeholders turned back into copies of the original tags.
+    """
+    nodes = []
+    for child in translated.children:
+        if isinstance(child, Tag):
+            match = PLACEHOLDER_ID.fullmatch(child.get('id') or "")
+            number = int(match.group(1)) if match and child.name == "span" else 0
+            if not 1 <= number <= len(tags) or number in used:
+                raise ValueError(f"unexpected tag in the translation: {child.name} {child.attrs}")
+            used.add(number)
+            original = tags[number - 1]
+            tag = Tag(name=original.name, attrs=dict(original.attrs))
+            for node in decode_unit(child, tags, used):
+                tag.append(node)
+            nodes.append(tag)
+        elif type(child) is NavigableString:
+            nodes.append(NavigableString(str(child)))
+    return nodes
+
+
+def unit_source(run):
+    """
+    The string sent for a run and the tags it stands for, plus the whitespace around it.
+    """
+    tags = []
+    source = encode_unit(run, tags)
+    text = source.strip()
+    return text, tags, source[:len(source) - len(source.lstrip())], source[len(source.rstrip()):]
+
+
+class Translator:
+    """
+    Translation with a persistent cache and batched backend calls.
+
+    Translations are stored in SQLite keyed by (sha256 of the source text, target language,
+    backend), so re-importing the same pages costs no API call and no billed character.
+    translate_many() looks up all the texts at once and sends only the missing ones,
+    deduplicated and packed into as few backend calls as the limits allow.
+    """
+    def __init__(self, backend, cache_path=".translation-cache.sqlite"):
+        self.backend = backend
+        self.lock = threading.Lock()
+        # Import threads share the connection, every use holds the lock
+        self.db = sqlite3.connect(cache_path, timeout=30, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS translations ("
+                        "hash TEXT NOT NULL, target TEXT NOT NULL, backend TEXT NOT NULL, translated TEXT NOT NULL, "
+                        "PRIMARY KEY (hash, target, backend))")
+        self.db.commit()
+        self.stats = {'cached': 0, 'translated': 0, 'characters': 0, 'calls': 0}
+
+    def backend_key(self, text_only):
+        # Plain text and HTML translations of the same string differ in escaping, they are cached apart
+        return self.backend.name + ("/text" if text_only else "")
+
+    def lookup(self, hashes, target, text_only=False):
+        found = {}
+        hashes = list(hashes)
+        with self.lock:
+            # SQLite limits the number of ? parameters, 500 at a time stays well below it
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self.db.execute(f"SELECT hash, translated FROM translations WHERE target = ? AND backend = ? "
+                                       f"AND hash IN ({', '.join('?' * len(chunk))})",
+                                       [target, self.backend_key(text_only)] + chunk)
+                found.update(rows)
+        return found
+
+    def batches(self, texts):
+        batch, size = [], 0
+        for text in texts:
+            if batch and (len(batch) >= self.backend.max_batch or size + len(text) > self.backend.max_chars):
+                yield batch
+                batch, size = [], 0
+            batch.append(text)
+            size += len(text)
+        if batch:
+            yield batch
+
+    def translate_many(self, texts, target, text_only=False):
+        """
+        Translate a list of texts, the result keeps the order. Texts that fail keep the original.
+        """
+        hashes = {text: hashlib.sha256(text.encode()).hexdigest() for text in texts if text.strip()}
+        results = self.lookup(set(hashes.values()), target, text_only)
+        missing = [text for text, key in hashes.items() if key not in results]
+        with self.lock:
+            self.stats['cached'] += len(hashes) - len(missing)
+        for batch in self.batches(missing):
+            try:
+                translated = self.backend.translate(batch, target, text_only)
+            except Exception as e:
+                print(f"Error in translation: {e}")
+                continue
+            with self.lock:
+                self.stats['calls'] += 1
+                self.stats['translated'] += len(batch)
+                self.stats['characters'] += sum(len(text) for text in batch)
+                with self.db:
+                    self.db.executemany("INSERT OR REPLACE INTO translations (hash, target, backend, translated) "
+                                        "VALUES (?, ?, ?, ?)",
+                                        [(hashes[text], target, self.backend_key(text_only), result)
+                                         for text, result in zip(batch, translated)])
+            results.update((hashes[text], result) for text, result in zip(batch, translated))
+        return [results.get(hashes.get(text), text) for text in texts]
+
+    def translate(self, text, target):
+        return self.translate_many([text], target)[0]
+
+    def translate_html_many(self, documents, target):
+        """
+        Translate HTML documents paragraph by paragraph, the tags and attributes stay as they are.
+
+        Every run of inline content (see translation_units()) is sent as one string, with
+        placeholders for its inline tags, so the translation can reorder and inflect the words
+        of the whole sentence. The runs of all the documents go to translate_many() together,
+        so a text repeated in several places is translated once and the whole list costs as
+        few calls as possible. A run whose placeholders do not come back is translated text
+        node by text node instead.
+        """
+        soups = [BeautifulSoup(document, "html.parser") for document in documents]
+        runs = [run for soup in soups for run in translation_units(soup)]
+        sources = [unit_source(run) for run in runs]
+        translated = self.translate_many([text for text, _, _, _ in sources], target)
+        fallback = []
+        for run, (text, tags, leading, trailing), result in zip(runs, sources, translated):
+            used = set()
+            try:
+                nodes = decode_unit(BeautifulSoup(result, "html.parser"), tags, used)
+                if len(used) != len(tags):
+                    raise ValueError(f"{len(tags) - len(used)} tags missing from the translation")
+            except ValueError as e:
+                print(f"Translation of '{text[:60]}' keeps its tags apart: {e}")
+                fallback += text_nodes(run)
+                continue
+            # The whitespace around the run separates it from the tags next to it, keep it
+            for node in [NavigableString(leading)] + nodes + [NavigableString(trailing)]:
+                run[0].insert_before(node)
+            for node in run:
+                node.extract()
+        self.translate_nodes(fallback, target)
+        return [str(soup) for soup in soups]
+
+    def translate_nodes(self, nodes, target):
+        """
+        Translate text nodes one by one in place, for the runs whose tags did not survive.
+        """
+        translated = self.translate_many([node.strip() for node in nodes], target, text_only=True)
+        for node, text in zip(nodes, translated):
+            leading = node[:len(node) - len(node.lstrip())]
+            trailing = node[len(node.rstrip()):]
+            node.replace_with(leading + text + trailing)
+
+    def translate_html(self, document, target):
+        return self.translate_html_many([document], target)[0]
+
+    def uncached(self, texts, target, text_only=False):
+        """
+        The distinct texts translate_many() would send to the backend, without sending them.
+        """
+        hashes = {text: hashlib.sha256(text.encode()).hexdigest() for text in texts if text.strip()}
+        found = self.lookup(set(hashes.values()), target, text_only)
+        return [text for text, key in hashes.items() if key not in found]
+
+    def uncached_html(self, documents, target):
+        """
+        The distinct runs translate_html_many() would send to the backend.
+        """
+        texts = [unit_source(run)[0] for document in documents
+                 for run in translation_units(BeautifulSoup(document, "html.parser"))]
+        return self.uncached(texts, target)
+
+    def summary(self):
+        return (f"Translations: {self.stats['cached']} from cache, {self.stats['translated']} translated "
+                f"in {self.stats['calls']} calls ({self.stats['characters']} characters)")
+
+
+def add_translation_arguments(parser):
+    parser.add_argument("--translator", choices=sorted(BACKENDS), default="google",
+                        help="Translation backend, stub only tags the text and needs no credentials (default: google)")
+    parser.add_argument("--translation-cache", default=".translation-cache.sqlite",
+                        help="SQLite file the translations are cached in (default: .translation-cache.sqlite)")
+
+
+def translator_from_args(args):
+    return Translator(BACKENDS[args.translator](), args.translation_cache)
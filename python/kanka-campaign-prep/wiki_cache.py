@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+
+class OfflineMiss(Exception):
+    pass
+
+
+class WikiCache:
+    """
+    On-disk cache of the fandom wiki pages, shared by get_locations_list.py and create_locations.py.
+
+    Every page is stored as <sha256 of the URL>.html next to a .json file with its ETag,
+    Last-Modified and download time. Pages younger than `ttl` seconds are served from disk,
+    older ones are revalidated with a conditional GET (a 304 costs no body), and kept when the
+    wiki cannot be reached or answers with an error. In offline mode
+    only the disk is used and a missing page raises OfflineMiss. Requests that do go to the
+    network are spaced at least `delay` seconds apart per host, whatever the number of threads.
+    """
+    def __init__(self, path=".wiki-cache", ttl=24 * 3600, offline=False, pool_size=10, delay=0.0):
+        self.path = path
+        self.ttl = ttl
+        self.offline = offline
+        self.delay = delay
+        self.host_next = {}
+        # One keep-alive session for all the pages, the crawler threads share its pool
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'revalidated': 0, 'downloaded': 0, 'stale': 0}
+
+    def entry_path(self, url):
+        return os.path.join(self.path, hashlib.sha256(url.encode()).hexdigest())
+
+    def wait_for_host(self, url):
+        """
+        Politeness: reserve the next request slot of the host and sleep until it comes.
+        """
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.host_next.get(host, 0))
+            self.host_next[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def load(self, url):
+        base = self.entry_path(url)
+        try:
+            with open(base + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(base + ".html", "rb") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def store(self, url, meta, content=None):
+        os.makedirs(self.path, exist_ok=True)
+        base = self.entry_path(url)
+        # Write then rename, a crash or a second thread never leaves half a page behind
+        if content is not None:
+            with open(f"{base}.html.{threading.get_ident()}", "wb") as f:
+                f.write(content)
+            os.replace(f"{base}.html.{threading.get_ident()}", base + ".html")
+        with open(f"{base}.json.{threading.get_ident()}", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{base}.json.{threading.get_ident()}", base + ".json")
+
+    def get(self, url):
+        """
+        Return the page body, from the disk when it is fresh enough.
+        """
+        meta, content = self.load(url)
+        if content is not None and (self.offline or time.time() - meta['fetched_at'] < self.ttl):
+            self.count('hits')
+            return content
+        if self.offline:
+            raise OfflineMiss(f"{url} is not in the wiki cache {self.path}")
+
+        headers = {}
+        if content is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        if self.delay:
+            self.wait_for_host(url)
+        try:
+            response = self.session.get(url, headers=headers, timeout=30)
+            if response.status_code == 304 and content is not None:
+                self.count('revalidated')
+                meta['fetched_at'] = time.time()
+                self.store(url, meta)
+                return content
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if content is None:
+                raise
+            # A stale page beats no page, it is revalidated again on the next run
+            print(f"Could not revalidate {url} ({e}), using the cached copy")
+            self.count('stale')
+            return content
+        self.count('downloaded')
+        self.store(url, {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+        }, response.content)
+        return response.content
+
+    def summary(self):
+        return (f"Wiki pages: {self.stats['hits']} from cache, {self.stats['revalidated']} revalidated, "
+                f"{self.stats['downloaded']} downloaded, {self.stats['stale']} stale")
+
+
+def add_cache_arguments(parser):
+    """
+    The cache options both scripts take.
+    """
+    parser.add_argument("--cache-dir", default=".wiki-cache", help="Directory of the wiki page cache (default: .wiki-cache)")
+    parser.add_argument("--cache-ttl", type=float, default=24,
+                        help="Hours a cached page is used before it is revalidated with the wiki (default: 24)")
+    parser.add_argument("--offline", action="store_true", help="Only use cached pages, never contact the wiki")
+    parser.add_argument("--wiki-delay", type=float, default=0.25,
+                        help="Seconds between two downloads from the same wiki host (default: 0.25)")
+
+
+def cache_from_args(args, pool_size=10):
+    return WikiCache(args.cache_dir, args.cache_ttl * 3600, args.offline, pool_size, args.wiki_delay)
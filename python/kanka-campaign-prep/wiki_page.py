@@ -0,0 +1,164 @@
+import re
+
+from bs4 import BeautifulSoup, Tag
+
+try:
+    import lxml.html
+    # lxml builds the tree in C, several times faster than BeautifulSoup on any parser
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+BASE_URL = "https://pillarsofeternity.fandom.com"
+
+HEADINGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+RELATIVE_HREF = re.compile(r"""(<a\b[^>]*?\bhref\s*=\s*["'])/(?!/)""", re.IGNORECASE)
+
+
+def update_links(html_content, base_url=BASE_URL):
+    """
+    Update all relative links in the html_content to absolute links, without parsing it.
+    """
+    return RELATIVE_HREF.sub(lambda match: f"{match.group(1)}{base_url}/", html_content)
+
+
+def section_title(section_id):
+    return f"<h3>{section_id.replace('_', ' ').title()}</h3>"
+
+
+class WikiPage:
+    """
+    A fandom wiki page, parsed once for all the extractions done on it.
+
+    The section headings are indexed by their anchor id in one pass, each
+    extract_sections() call then goes straight to the headings it needs. Only the
+    links of the extracted elements are made absolute, no second parse is needed for
+    them. This is the BeautifulSoup version, parse_page() uses LxmlWikiPage when lxml
+    is installed.
+    """
+    def __init__(self, content, base_url=BASE_URL):
+        self.base_url = base_url
+        self.soup = BeautifulSoup(content, "html.parser")
+        self.headings = {}
+        for span in self.soup.find_all('span', id=True):
+            # The first one wins, like soup.find() would
+            if span.parent.name in HEADINGS:
+                self.headings.setdefault(span['id'], span.parent)
+
+    def extract_infobox(self):
+        """
+        Return the loading screen image URL and the location type from the page infobox.
+        """
+        image_url = None  # Initialize variable to hold the image URL
+        location_type = None
+
+        # Find the type of location
+        type_section = self.soup.find("div", {"data-source": "type"})
+        if type_section:
+            type_value = type_section.find("div", class_="pi-data-value pi-font")
+            if type_value:
+                location_type = type_value.text.strip()
+
+        for section in self.soup.find_all("section", class_="pi-item pi-group pi-border-color"):
+            h2_tag = section.find("h2")
+            if h2_tag and "Loading screen" in h2_tag.text:
+                figure = section.find("figure", class_="pi-item pi-image")
+                if figure and figure.a and 'href' in figure.a.attrs:
+                    image_url = figure.a['href'].split("/revision")[0]  # Clean up the URL
+                    break  # Break after finding the first matching image
+
+        return image_url, location_type
+
+    def section_elements(self, heading):
+        for sibling in heading.next_siblings:
+            if sibling.name == "h2":
+                break
+            # Only the elements, the text between them is whitespace
+            if isinstance(sibling, Tag):
+                yield sibling
+
+    def to_html(self, element):
+        for a_tag in element.find_all('a', href=True):
+            if a_tag['href'].startswith("/") and not a_tag['href'].startswith("//"):
+                a_tag['href'] = self.base_url + a_tag['href']
+        if element.name == "a" and element.get('href', '').startswith("/") and not element['href'].startswith("//"):
+            element['href'] = self.base_url + element['href']
+        return str(element)
+
+    def extract_sections(self, section_ids):
+        """
+        Return the HTML of the given sections, each one up to the next h2.
+        """
+        all_content = []
+        for section_id in section_ids:
+            section_heading = self.headings.get(section_id)
+            if section_heading is None:
+                continue
+            if section_id != "Background":
+                all_content.append(section_title(section_id))
+            html_content = "".join(self.to_html(element) for element in self.section_elements(section_heading))
+            all_content.append(html_content if html_content else f"{section_id} section not found.\n")
+        return "".join(all_content)
+
+
+class LxmlWikiPage(WikiPage):
+    """
+    WikiPage on an lxml.html tree, the same extractions without BeautifulSoup.
+    """
+    def __init__(self, content, base_url=BASE_URL):
+        self.base_url = base_url
+        if isinstance(content, bytes):
+            # The fandom pages are UTF-8, do not let lxml guess
+            self.root = lxml.html.document_fromstring(content, parser=lxml.html.HTMLParser(encoding="utf-8"))
+        else:
+            self.root = lxml.html.document_fromstring(content)
+        self.headings = {}
+        for heading in self.root.iter(*HEADINGS):
+            for span in heading.iterchildren("span"):
+                if span.get("id"):
+                    self.headings.setdefault(span.get("id"), heading)
+
+    def extract_infobox(self):
+        image_url = None
+        location_type = None
+
+        type_section = self.root.find('.//div[@data-source="type"]')
+        if type_section is not None:
+            type_value = type_section.find('.//div[@class="pi-data-value pi-font"]')
+            if type_value is not None:
+                location_type = type_value.text_content().strip()
+
+        for section in self.root.iterfind('.//section[@class="pi-item pi-group pi-border-color"]'):
+            h2_tag = section.find('.//h2')
+            if h2_tag is not None and "Loading screen" in h2_tag.text_content():
+                figure = section.find('.//figure[@class="pi-item pi-image"]')
+                link = figure.find('.//a') if figure is not None else None
+                if link is not None and link.get('href') is not None:
+                    image_url = link.get('href').split("/revision")[0]
+                    break
+
+        return image_url, location_type
+
+    def section_elements(self, heading):
+        for sibling in heading.itersiblings():
+            if sibling.tag == "h2":
+                break
+            # Comments and processing instructions are siblings too in lxml
+            if isinstance(sibling.tag, str):
+                yield sibling
+
+    def to_html(self, element):
+        for a_tag in element.iter("a"):
+            href = a_tag.get('href')
+            if href and href.startswith("/") and not href.startswith("//"):
+                a_tag.set('href', self.base_url + href)
+        return lxml.html.tostring(element, encoding="unicode", with_tail=False)
+
+
+def parse_page(content, base_url=BASE_URL):
+    """
+    Parse a wiki page with the fastest parser available.
+    """
+    if HTML_PARSER == "lxml":
+        return LxmlWikiPage(content, base_url)
+    return WikiPage(content, base_url)